@@ -5,6 +5,9 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
+
+Async views (e.g. payment:payment-create-async) run without a thread per request
+only when served through this application, e.g. `uvicorn config.asgi:application`.
 """
 
 import os
@@ -0,0 +1,91 @@
+import logging
+import os
+import smtplib
+import threading
+import time
+
+from celery.signals import worker_process_shutdown
+from django.conf import settings
+from django.core.mail import get_connection
+
+logger = logging.getLogger(__name__)
+
+
+class PooledEmailConnection:
+    """
+    Открытое соединение с почтовым сервером, переиспользуемое задачами одного процесса воркера.
+    Соединение пересоздается после EMAIL_CONNECTION_IDLE_TIMEOUT секунд простоя,
+    после EMAIL_CONNECTION_MAX_MESSAGES писем и при обрыве связи.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.connection = None
+        self.pid = None
+        self.sent = 0
+        self.last_used = 0.0
+
+    def _close(self):
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            except (smtplib.SMTPException, OSError):
+                pass
+        self.connection = None
+
+    def _open(self):
+        self._close()
+        self.connection = get_connection(fail_silently=False)
+        self.connection.open()
+        self.pid = os.getpid()
+        self.sent = 0
+
+    def _get(self):
+        expired = (
+            self.connection is None
+            # Соединение унаследовано от родительского процесса при fork
+            or self.pid != os.getpid()
+            or time.monotonic() - self.last_used > settings.EMAIL_CONNECTION_IDLE_TIMEOUT
+            or self.sent >= settings.EMAIL_CONNECTION_MAX_MESSAGES
+        )
+        if expired:
+            if self.pid != os.getpid():
+                self.connection = None
+            self._open()
+        return self.connection
+
+    def _send_batch(self, messages):
+        try:
+            sent = self._get().send_messages(messages)
+        except (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, ConnectionError):
+            logger.info('Email connection lost, reconnecting')
+            self._open()
+            sent = self.connection.send_messages(messages)
+        self.sent += len(messages)
+        self.last_used = time.monotonic()
+        return sent or 0
+
+    def send_messages(self, messages):
+        """Отправляет письма, не превышая лимит писем на одно соединение"""
+        total = 0
+        with self.lock:
+            while messages:
+                capacity = max(settings.EMAIL_CONNECTION_MAX_MESSAGES - self.sent, 0)
+                if capacity == 0:
+                    self._open()
+                    capacity = settings.EMAIL_CONNECTION_MAX_MESSAGES
+                total += self._send_batch(messages[:capacity])
+                messages = messages[capacity:]
+        return total
+
+    def close(self):
+        with self.lock:
+            self._close()
+
+
+email_connection = PooledEmailConnection()
+
+
+@worker_process_shutdown.connect
+def close_email_connection(**kwargs):
+    email_connection.close()
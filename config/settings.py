@@ -134,7 +134,7 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -145,7 +145,10 @@ REST_FRAMEWORK = {
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=30),
-    'UPDATE_LAST_LOGIN': True,
+    # Время входа не пишется в строку пользователя при каждой выдаче токена: с Redis (CACHE_ENABLED) оно копится
+    # в буфере и выгружается задачей flush_last_login_buffer, без Redis - записывается сразу
+    'UPDATE_LAST_LOGIN': False,
+    'TOKEN_OBTAIN_SERIALIZER': 'users.seriliazers.BufferedLastLoginTokenObtainPairSerializer',
 }
 
 ## CORS
@@ -178,8 +181,34 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'users.tasks.disconnect_inactive_users',  # Путь к задаче
         'schedule': timedelta(minutes=2),  # Расписание выполнения задачи (например, каждые 10 минут)
     },
+    'task-flush_last_login_buffer': {
+        'task': 'users.tasks.flush_last_login_buffer',
+        'schedule': timedelta(seconds=30),
+    },
+    'task-refresh_payment_intents': {
+        'task': 'payment.tasks.refresh_payment_intents',
+        'schedule': timedelta(minutes=5),
+    },
+    'task-dispatch_notification_outbox': {
+        'task': 'courses.tasks.dispatch_notification_outbox',
+        'schedule': timedelta(seconds=10),
+    },
 }
 
+# Через сколько дней без входа пользователь отключается и сколько пользователей отключается за одну транзакцию
+INACTIVE_USER_DAYS = 30
+INACTIVE_USERS_SWEEP_BATCH_SIZE = 1000
+# Как часто отключение проходит по всем активным пользователям без водяного знака
+INACTIVE_USERS_FULL_SWEEP_INTERVAL = timedelta(days=1)
+
+# Сколько пользователей обновляет один UPDATE при выгрузке буфера времени входа
+# и на сколько секунд выгрузка блокирует параллельные запуски
+LAST_LOGIN_FLUSH_BATCH_SIZE = 1000
+LAST_LOGIN_FLUSH_LOCK_TIMEOUT = 60
+
+# Размер пачки задач, отправляемых из outbox в брокер за одну транзакцию
+NOTIFICATION_OUTBOX_BATCH_SIZE = 100
+
 ## CACHE
 
 CACHE_ENABLED = os.getenv('CACHE_ENABLED') == 'True'
@@ -190,15 +219,68 @@ if CACHE_ENABLED:
             "LOCATION": os.getenv('CACHE_LOCATION'),
         }
     }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# Время жизни закешированного множества подписок пользователя (секунды)
+SUBSCRIPTIONS_CACHE_TIMEOUT = 60 * 60
+# Время жизни закешированных ответов списка и карточки курса (секунды)
+COURSES_RESPONSE_CACHE_TIMEOUT = 60 * 15
+
+# Кеш пользователей для JWT-аутентификации: время жизни в Redis, в памяти процесса (секунды) и размер LRU
+# Без CACHE_ENABLED общий кеш не используется: изменения пользователя видны другим процессам через USER_CACHE_LOCAL_TTL
+USER_CACHE_TIMEOUT = 60 * 5
+USER_CACHE_LOCAL_TTL = 5
+USER_CACHE_LOCAL_SIZE = 10000
+
+## STRIPE
+
+STRIPE_SECRET_KEY = os.getenv('STRIPE_SECRET_KEY')
+# Адрес API Stripe (можно указать локальный stub-сервер, например stripe-mock)
+STRIPE_API_BASE = os.getenv('STRIPE_API_BASE', 'https://api.stripe.com')
+STRIPE_WEBHOOK_SECRET = os.getenv('STRIPE_WEBHOOK_SECRET')
+# Таймауты HTTP-запросов к Stripe (секунды)
+STRIPE_CONNECT_TIMEOUT = 2
+STRIPE_READ_TIMEOUT = 10
+# Размер пула keep-alive соединений с Stripe и число повторов запроса при сетевых ошибках
+STRIPE_POOL_SIZE = 10
+STRIPE_MAX_NETWORK_RETRIES = 2
+# Пакетное создание платежей: максимум элементов в запросе и параллельных запросов к Stripe
+PAYMENT_BATCH_MAX_SIZE = 100
+PAYMENT_BATCH_WORKERS = 10
+# Сколько хранится в кеше ответ на запрос создания платежа с Idempotency-Key (секунды)
+IDEMPOTENCY_KEY_CACHE_TIMEOUT = 60 * 60 * 24
+# Через сколько локально сохраненное состояние PaymentIntent считается устаревшим
+STRIPE_SYNC_TTL = timedelta(minutes=15)
+# Сколько платежей обновляет одна фоновая задача
+STRIPE_SYNC_BATCH_SIZE = 100
+# Размер пачки при потоковом импорте платежей (import_payments)
+PAYMENT_IMPORT_BATCH_SIZE = 5000
+# Сколько строк за раз читает курсор потоковой выгрузки платежей (/payment/export/)
+PAYMENT_EXPORT_CHUNK_SIZE = 2000
 
 ## EMAIL
 
+# Количество получателей в одной задаче рассылки об обновлении курса
+COURSE_NOTIFICATION_CHUNK_SIZE = 500
+# Максимум курсов в одном запросе пакетной подписки/отписки
+COURSE_BULK_SUBSCRIPTION_MAX_SIZE = 100
+# Окно (секунды), в пределах которого повторные обновления курса дают одно уведомление
+COURSE_NOTIFICATION_DEBOUNCE_WINDOW = 60 * 5
+
 EMAIL_HOST = os.getenv('EMAIL_HOST')
 EMAIL_PORT = os.getenv('EMAIL_PORT')
 EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')
 EMAIL_USE_SSL = os.getenv('EMAIL_USE_SSL') == 'True'
 EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS') == 'True'
+# Переиспользование SMTP-соединения в воркерах: время простоя (секунды) и лимит писем на соединение
+EMAIL_CONNECTION_IDLE_TIMEOUT = 60
+EMAIL_CONNECTION_MAX_MESSAGES = 100
 
 # Используйте тестовый брокер в режиме тестирования
 if 'test' in sys.argv:
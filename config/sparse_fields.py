@@ -0,0 +1,51 @@
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.serializers import ListSerializer
+
+FIELDS_QUERY_PARAM = 'fields'
+OMIT_QUERY_PARAM = 'omit'
+
+
+def get_sparse_fields(request):
+    """Возвращает множества полей из ?fields= и ?omit= (только для чтения)"""
+    if request is None or request.method not in SAFE_METHODS:
+        return set(), set()
+    query_params = getattr(request, 'query_params', request.GET)
+    fields = {name for name in query_params.get(FIELDS_QUERY_PARAM, '').split(',') if name}
+    omit = {name for name in query_params.get(OMIT_QUERY_PARAM, '').split(',') if name}
+    return fields, omit
+
+
+class SparseFieldsSerializerMixin:
+    """Оставляет в выдаче корневого сериализатора только поля из ?fields= и убирает поля из ?omit="""
+
+    def is_root_serializer(self):
+        parent = self.parent
+        return parent is None or (isinstance(parent, ListSerializer) and parent.parent is None)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self.is_root_serializer():
+            return fields
+        requested, omitted = get_sparse_fields(self.context.get('request'))
+        for name in list(fields):
+            if (requested and name not in requested) or name in omitted:
+                fields.pop(name)
+        return fields
+
+
+class SparseFieldsViewMixin:
+    """Сужает SELECT через .only() до колонок, которые нужны урезанному сериализатору"""
+    # Поля, которые нужны независимо от выдачи (например, для проверки прав)
+    sparse_required_fields = ()
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        requested, omitted = get_sparse_fields(self.request)
+        if not requested and not omitted:
+            return queryset
+
+        opts = queryset.model._meta
+        concrete_fields = {field.name for field in opts.concrete_fields}
+        sources = {field.source.split('.')[0] for field in self.get_serializer().fields.values()}
+        only = {opts.pk.name, *self.sparse_required_fields, *(sources & concrete_fields)}
+        return queryset.only(*only)
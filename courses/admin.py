@@ -2,6 +2,8 @@ from django.contrib import admin
 
 from courses.models.course import Course
 from courses.models.lesson import Lesson
+from courses.models.outbox import NotificationOutbox
 
 admin.site.register(Course)
 admin.site.register(Lesson)
+admin.site.register(NotificationOutbox)
@@ -0,0 +1,86 @@
+import socketserver
+import threading
+import time
+
+from django.core.mail import EmailMessage, send_mail
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from config.mail import PooledEmailConnection
+
+
+class SMTPStandInHandler(socketserver.StreamRequestHandler):
+    """Минимальный SMTP-сервер: принимает письма и ничего с ними не делает"""
+
+    def reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode())
+
+    def handle(self):
+        self.reply('220 localhost SMTP stand-in')
+        in_data = False
+        for raw_line in self.rfile:
+            line = raw_line.decode(errors='replace').rstrip('\r\n')
+            if in_data:
+                if line == '.':
+                    in_data = False
+                    self.reply('250 OK')
+                continue
+            command = line[:4].upper()
+            if command == 'EHLO':
+                self.reply('250 localhost')
+            elif command == 'DATA':
+                in_data = True
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+            elif command == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('250 OK')
+
+
+class SMTPStandInServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class Command(BaseCommand):
+    help = 'Benchmark notification delivery with and without SMTP connection reuse against a local SMTP stand-in'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=500)
+
+    def handle(self, *args, **options):
+        count = options['messages']
+        server = SMTPStandInServer(('127.0.0.1', 0), SMTPStandInHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        smtp_settings = {
+            'EMAIL_BACKEND': 'django.core.mail.backends.smtp.EmailBackend',
+            'EMAIL_HOST': '127.0.0.1',
+            'EMAIL_PORT': server.server_address[1],
+            'EMAIL_USE_TLS': False,
+            'EMAIL_USE_SSL': False,
+            'EMAIL_HOST_USER': '',
+            'EMAIL_HOST_PASSWORD': '',
+        }
+        try:
+            with override_settings(**smtp_settings):
+                # Как send_mail в задачах до переиспользования: новое соединение на каждое письмо
+                started = time.perf_counter()
+                for i in range(count):
+                    send_mail('Benchmark', 'Benchmark', None, [f'user{i}@example.com'])
+                without_reuse = count / (time.perf_counter() - started)
+
+                connection = PooledEmailConnection()
+                started = time.perf_counter()
+                for i in range(count):
+                    connection.send_messages([EmailMessage('Benchmark', 'Benchmark', None, [f'user{i}@example.com'])])
+                with_reuse = count / (time.perf_counter() - started)
+                connection.close()
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        self.stdout.write(f'without reuse: {without_reuse:.1f} messages/s')
+        self.stdout.write(f'with reuse: {with_reuse:.1f} messages/s')
+        self.stdout.write(self.style.SUCCESS(f'speedup: {with_reuse / without_reuse:.2f}x'))
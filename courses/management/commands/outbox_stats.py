@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from courses.services import get_outbox_stats
+
+
+class Command(BaseCommand):
+    help = 'Show notification outbox lag and batch sizes'
+
+    def handle(self, *args, **options):
+        stats = get_outbox_stats()
+        self.stdout.write(self.style.SUCCESS(
+            f'pending: {stats["pending"]}, lag: {stats["lag_seconds"]:.3f}s, '
+            f'last run: {stats.get("dispatched_at")}, batches: {stats.get("batch_sizes", [])}, '
+            f'max lag: {stats.get("max_lag_seconds", 0.0):.3f}s'
+        ))
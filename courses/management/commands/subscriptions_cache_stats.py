@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from courses.services import get_subscriptions_cache_stats
+
+
+class Command(BaseCommand):
+    help = 'Show hit/miss counters of the subscriptions cache'
+
+    def handle(self, *args, **options):
+        stats = get_subscriptions_cache_stats()
+        self.stdout.write(self.style.SUCCESS(
+            f'hits: {stats["hits"]}, misses: {stats["misses"]}, hit rate: {stats["hit_rate"]:.2%}'
+        ))
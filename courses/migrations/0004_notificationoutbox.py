@@ -0,0 +1,30 @@
+# Generated by Django 5.0 on 2026-10-18 14:11
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0003_alter_coursesubscription_course_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task', models.CharField(max_length=255, verbose_name='task')),
+                ('args', models.JSONField(default=list, verbose_name='args')),
+                ('dedup_key', models.CharField(blank=True, db_index=True, max_length=255, null=True, verbose_name='dedup_key')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='created_at')),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='available_at')),
+            ],
+            options={
+                'verbose_name': 'notification outbox',
+                'verbose_name_plural': 'notification outbox',
+                'indexes': [models.Index(fields=['available_at', 'id'], name='outbox_available_at_id_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,82 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Prefetch
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.generics import get_object_or_404
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from courses.models.course import Course
+from courses.models.lesson import Lesson
+from courses.serializer.lesson import is_compact
+from courses.services import get_course_version, get_courses_list_version, get_subscriptions_version
+
+RESPONSE_CACHE_KEY = 'courses:response:{digest}'
+
+
+class CourseResponseCacheMixin:
+    """
+    Кеширует ответы list/retrieve по версии курса (списка курсов) и версии подписок пользователя.
+    Отдает строгий ETag и отвечает 304 на If-None-Match без запуска сериализаторов.
+    """
+
+    def get_response_cache_key(self, version):
+        user = self.request.user
+        if user.is_authenticated:
+            # Версии подписок разных пользователей могут совпасть, поэтому ключ включает и id пользователя
+            user_key = f'{user.pk}:{get_subscriptions_version(user.pk)}'
+        else:
+            user_key = 'anonymous'
+        raw_key = f'{version}:{user_key}:{self.request.get_full_path()}'
+        digest = hashlib.sha256(raw_key.encode()).hexdigest()
+        return RESPONSE_CACHE_KEY.format(digest=digest)
+
+    def cached_response(self, cache_key, render):
+        entry = cache.get(cache_key)
+        if entry is None:
+            response = render()
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            etag = '"%s"' % hashlib.sha256(JSONRenderer().render(response.data)).hexdigest()
+            entry = {'etag': etag, 'data': response.data}
+            # Данные из незавершенной транзакции могут быть откатены - в кеш их не кладем
+            if not connection.in_atomic_block:
+                cache.set(cache_key, entry, timeout=settings.COURSES_RESPONSE_CACHE_TIMEOUT)
+        else:
+            response = Response(entry['data'])
+
+        if entry['etag'] in parse_etags(self.request.headers.get('If-None-Match', '')):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        response['ETag'] = entry['etag']
+        return response
+
+    def list(self, request, *args, **kwargs):
+        cache_key = self.get_response_cache_key(get_courses_list_version())
+        return self.cached_response(cache_key, lambda: super(CourseResponseCacheMixin, self).list(
+            request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        course_id = self.kwargs[lookup_url_kwarg]
+        cache_key = self.get_response_cache_key(get_course_version(course_id))
+        if cache.get(cache_key) is not None:
+            # Проверяем существование курса и права доступа без аннотаций и сериализации
+            obj = get_object_or_404(self.queryset.only('pk', 'owner'), **{self.lookup_field: course_id})
+            self.check_object_permissions(request, obj)
+        return self.cached_response(cache_key, lambda: super(CourseResponseCacheMixin, self).retrieve(
+            request, *args, **kwargs))
+
+
+class LessonPrefetchMixin:
+    """Загружает курсы уроков одним запросом вместе с аннотациями для вложенного CourseSerializer"""
+
+    def get_queryset(self):
+        if is_compact(self.request, 'courses'):
+            courses = Course.objects.only('pk')
+        else:
+            courses = Course.objects.with_stats(self.request.user)
+        return Lesson.objects.prefetch_related(Prefetch('courses', queryset=courses)).order_by('pk')
@@ -1,9 +1,28 @@
 from django.db import models
+from django.db.models import Count, Exists, OuterRef, Prefetch, Value
 from django.utils import timezone
 
 from constants import NULLABLE
 
 
+class CourseQuerySet(models.QuerySet):
+
+    def with_stats(self, user):
+        """Аннотирует курсы количеством уроков и признаком подписки пользователя"""
+        if user is not None and user.is_authenticated:
+            is_subscribed = Exists(
+                CourseSubscription.objects.filter(course=OuterRef('pk'), user=user, is_active=True)
+            )
+        else:
+            is_subscribed = Value(False)
+        # Для выдачи нужны только id уроков
+        lessons = self.model._meta.get_field('lessons').related_model
+        return self.annotate(
+            lessons_count=Count('lessons', distinct=True),
+            is_subscribed=is_subscribed,
+        ).prefetch_related(Prefetch('lessons', queryset=lessons.objects.only('pk')))
+
+
 class Course(models.Model):
     name = models.CharField(max_length=150, verbose_name='course')
     preview = models.ImageField(verbose_name='preview', **NULLABLE)
@@ -12,6 +31,8 @@ class Course(models.Model):
     owner = models.ForeignKey('users.User', on_delete=models.CASCADE, null=True)
     last_updated = models.DateTimeField(default=timezone.now)
 
+    objects = CourseQuerySet.as_manager()
+
     def __str__(self):
         return f'{self.name}: {self.description}'
 
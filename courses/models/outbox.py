@@ -0,0 +1,22 @@
+from django.db import models
+from django.utils import timezone
+
+from constants import NULLABLE
+
+
+class NotificationOutbox(models.Model):
+    task = models.CharField(max_length=255, verbose_name='task')
+    args = models.JSONField(default=list, verbose_name='args')
+    dedup_key = models.CharField(max_length=255, verbose_name='dedup_key', db_index=True, **NULLABLE)
+    created_at = models.DateTimeField(default=timezone.now, verbose_name='created_at')
+    available_at = models.DateTimeField(default=timezone.now, verbose_name='available_at')
+
+    def __str__(self):
+        return f'{self.task}{tuple(self.args)}'
+
+    class Meta:
+        verbose_name = 'notification outbox'
+        verbose_name_plural = 'notification outbox'
+        indexes = [
+            models.Index(fields=['available_at', 'id'], name='outbox_available_at_id_idx'),
+        ]
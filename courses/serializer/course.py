@@ -1,10 +1,14 @@
+from django.conf import settings
 from rest_framework import serializers
 
+from config.sparse_fields import SparseFieldsSerializerMixin
+
 from courses.models.course import Course, CourseSubscription
 from courses.models.lesson import Lesson
+from courses.services import get_subscribed_course_ids
 
 
-class CourseSerializer(serializers.ModelSerializer):
+class CourseSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     lessons = serializers.PrimaryKeyRelatedField(queryset=Lesson.objects.all(), many=True)
     lessons_count = serializers.SerializerMethodField()
     is_subscribed = serializers.SerializerMethodField()
@@ -14,13 +18,18 @@ class CourseSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
     def get_lessons_count(self, obj):
+        # Значение из аннотации queryset'а (CourseViewSet), иначе - отдельный запрос
+        if hasattr(obj, 'lessons_count'):
+            return obj.lessons_count
         return obj.lessons.count()
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             # Проверяем, подписан ли текущий пользователь на данный курс
-            return CourseSubscription.objects.filter(user=request.user, course=obj, is_active=True).exists()
+            return obj.pk in get_subscribed_course_ids(request.user.pk)
         return False  # Если пользователь не аутентифицирован, считаем, что он не подписан
 
 
@@ -28,3 +37,8 @@ class CourseSubscriptionSerializer(serializers.ModelSerializer):
     class Meta:
         model = CourseSubscription
         fields = '__all__'
+
+
+class CourseIdsSerializer(serializers.Serializer):
+    course_ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False,
+                                       max_length=settings.COURSE_BULK_SUBSCRIPTION_MAX_SIZE)
@@ -1,14 +1,33 @@
 from rest_framework import serializers
 
+from config.sparse_fields import SparseFieldsSerializerMixin
+
 from courses.models.lesson import Lesson
 from courses.serializer.course import CourseSerializer
 from courses.validators import ValidateYoutubeLinks
 
+COMPACT_QUERY_PARAM = 'compact'
+
+
+def is_compact(request, field_name):
+    """Запрошено ли компактное представление поля - только id (?compact=courses)"""
+    if request is None:
+        return False
+    query_params = getattr(request, 'query_params', request.GET)
+    return field_name in query_params.get(COMPACT_QUERY_PARAM, '').split(',')
 
-class LessonSerializer(serializers.ModelSerializer):
+
+class LessonSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     courses = CourseSerializer(many=True, read_only=True)
     validators = [ValidateYoutubeLinks(field='video_url')]
 
     class Meta:
         model = Lesson
         fields = '__all__'
+
+    def get_fields(self):
+        fields = super().get_fields()
+        # По умолчанию курсы вложены целиком, только id - по ?compact=courses
+        if is_compact(self.context.get('request'), 'courses'):
+            fields['courses'] = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+        return fields
@@ -0,0 +1,189 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+
+from courses.models.course import CourseSubscription
+from courses.models.outbox import NotificationOutbox
+
+SUBSCRIPTIONS_KEY = 'subscriptions:{user_id}'
+SUBSCRIPTIONS_VERSION_KEY = 'subscriptions:{user_id}:version'
+SUBSCRIPTIONS_HITS_KEY = 'subscriptions:stats:hits'
+SUBSCRIPTIONS_MISSES_KEY = 'subscriptions:stats:misses'
+OUTBOX_STATS_KEY = 'notifications:outbox:stats'
+
+
+def _incr(key):
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Ключ мог быть вытеснен между add и incr
+        cache.set(key, 1, timeout=None)
+
+
+def get_subscribed_course_ids(user_id):
+    """Множество id курсов с активной подпиской пользователя (лениво загружается в кеш)"""
+    key = SUBSCRIPTIONS_KEY.format(user_id=user_id)
+    # Версия читается до запроса к БД: множество, прочитанное до изменения подписок,
+    # сохранится со старой версией и не будет использовано после ее увеличения
+    version = get_subscriptions_version(user_id)
+    entry = cache.get(key)
+    if entry is not None and entry[0] == version:
+        _incr(SUBSCRIPTIONS_HITS_KEY)
+        return entry[1]
+
+    _incr(SUBSCRIPTIONS_MISSES_KEY)
+    course_ids = set(
+        CourseSubscription.objects.filter(user_id=user_id, is_active=True).values_list('course_id', flat=True)
+    )
+    # Внутри незавершенной транзакции данные могут быть откатены - в кеш их не кладем
+    if not connection.in_atomic_block:
+        cache.set(key, (version, course_ids), timeout=settings.SUBSCRIPTIONS_CACHE_TIMEOUT)
+    return course_ids
+
+
+def _invalidate_subscribed_course_ids(user_id):
+    _bump_version(SUBSCRIPTIONS_VERSION_KEY.format(user_id=user_id))
+    # Множество не изменяется на месте (get -> изменение -> set теряет параллельные обновления):
+    # оно удаляется и при следующем обращении читается из БД
+    cache.delete(SUBSCRIPTIONS_KEY.format(user_id=user_id))
+
+
+def invalidate_subscribed_course_ids(user_id):
+    """Сбрасывает закешированное множество подписок после фиксации транзакции"""
+    transaction.on_commit(lambda: _invalidate_subscribed_course_ids(user_id))
+
+
+def subscribe_courses(user_id, course_ids):
+    """
+    Подписывает пользователя на курсы одним INSERT ... ON CONFLICT DO UPDATE: недостающие подписки
+    создаются, неактивные включаются. Возвращает id курсов, где подписка действительно изменилась,
+    поэтому параллельные запросы не приводят к ошибке уникальности и повторным уведомлениям.
+    """
+    course_ids = sorted(set(course_ids))
+    if not course_ids:
+        return set()
+    table = connection.ops.quote_name(CourseSubscription._meta.db_table)
+    now = CourseSubscription._meta.get_field('subscribed_at').get_db_prep_value(timezone.now(), connection)
+    values = ', '.join(['(%s, %s, %s, %s)'] * len(course_ids))
+    params = [param for course_id in course_ids for param in (user_id, course_id, True, now)]
+    with connection.cursor() as cursor:
+        # Строка возвращается только при вставке или реактивации: у активной подписки условие WHERE ложно
+        cursor.execute(
+            f'INSERT INTO {table} (user_id, course_id, is_active, subscribed_at) VALUES {values} '
+            f'ON CONFLICT (user_id, course_id) DO UPDATE '
+            f'SET is_active = EXCLUDED.is_active, subscribed_at = EXCLUDED.subscribed_at '
+            f'WHERE {table}.is_active = %s '
+            f'RETURNING course_id',
+            params + [False],
+        )
+        subscribed = {row[0] for row in cursor.fetchall()}
+        # Запрос в обход ORM не отправляет сигналы - кеш подписок сбрасываем явно
+        if subscribed:
+            invalidate_subscribed_course_ids(user_id)
+    return subscribed
+
+
+def unsubscribe_courses(user_id, course_ids):
+    """Деактивирует подписки одним UPDATE ... RETURNING; возвращает id курсов, от которых пользователь отписался"""
+    course_ids = sorted(set(course_ids))
+    if not course_ids:
+        return set()
+    table = connection.ops.quote_name(CourseSubscription._meta.db_table)
+    placeholders = ', '.join(['%s'] * len(course_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'UPDATE {table} SET is_active = %s '
+            f'WHERE user_id = %s AND course_id IN ({placeholders}) AND is_active = %s '
+            f'RETURNING course_id',
+            [False, user_id, *course_ids, True],
+        )
+        unsubscribed = {row[0] for row in cursor.fetchall()}
+        if unsubscribed:
+            invalidate_subscribed_course_ids(user_id)
+    return unsubscribed
+
+
+def get_subscriptions_cache_stats():
+    hits = cache.get(SUBSCRIPTIONS_HITS_KEY, 0)
+    misses = cache.get(SUBSCRIPTIONS_MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': hits / total if total else 0.0,
+    }
+
+
+COURSE_VERSION_KEY = 'courses:{course_id}:version'
+COURSES_LIST_VERSION_KEY = 'courses:list:version'
+
+
+def _get_version(key):
+    # Начальное значение от времени, чтобы после вытеснения ключа не совпасть со старыми записями
+    cache.add(key, time.time_ns(), timeout=None)
+    version = cache.get(key)
+    return version if version is not None else time.time_ns()
+
+
+def _bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def get_subscriptions_version(user_id):
+    return _get_version(SUBSCRIPTIONS_VERSION_KEY.format(user_id=user_id))
+
+
+def get_course_version(course_id):
+    return _get_version(COURSE_VERSION_KEY.format(course_id=course_id))
+
+
+def get_courses_list_version():
+    return _get_version(COURSES_LIST_VERSION_KEY)
+
+
+def _bump_course_versions(course_ids):
+    for course_id in course_ids:
+        _bump_version(COURSE_VERSION_KEY.format(course_id=course_id))
+    _bump_version(COURSES_LIST_VERSION_KEY)
+
+
+def bump_course_versions(course_ids):
+    """Инвалидирует закешированные ответы по курсам и общему списку курсов после фиксации транзакции"""
+    course_ids = list(course_ids)
+    transaction.on_commit(lambda: _bump_course_versions(course_ids))
+
+
+def enqueue_notification(task, *args, countdown=0, dedup_key=None):
+    """
+    Записывает задачу в outbox в текущей транзакции, отправку в брокер выполняет
+    dispatch_notification_outbox. Если передан dedup_key и такая задача уже ждет
+    отправки, новая запись не создается.
+    """
+    if dedup_key is not None and NotificationOutbox.objects.filter(dedup_key=dedup_key).exists():
+        return None
+    now = timezone.now()
+    return NotificationOutbox.objects.create(
+        task=task.name,
+        args=list(args),
+        dedup_key=dedup_key,
+        created_at=now,
+        available_at=now + timedelta(seconds=countdown),
+    )
+
+
+def get_outbox_stats():
+    stats = cache.get(OUTBOX_STATS_KEY, {})
+    oldest = NotificationOutbox.objects.filter(available_at__lte=timezone.now()).order_by('available_at').first()
+    return {
+        **stats,
+        'pending': NotificationOutbox.objects.count(),
+        'lag_seconds': (timezone.now() - oldest.available_at).total_seconds() if oldest else 0.0,
+    }
@@ -0,0 +1,41 @@
+from django.db.models.signals import post_save, post_delete, m2m_changed, pre_delete
+from django.dispatch import receiver
+
+from courses.models.course import Course, CourseSubscription
+from courses.models.lesson import Lesson
+from courses.services import invalidate_subscribed_course_ids, bump_course_versions
+
+
+@receiver(post_save, sender=CourseSubscription)
+def subscription_saved(sender, instance, **kwargs):
+    invalidate_subscribed_course_ids(instance.user_id)
+
+
+@receiver(post_delete, sender=CourseSubscription)
+def subscription_deleted(sender, instance, **kwargs):
+    invalidate_subscribed_course_ids(instance.user_id)
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def course_changed(sender, instance, **kwargs):
+    bump_course_versions([instance.pk])
+
+
+@receiver(m2m_changed, sender=Course.lessons.through)
+def course_lessons_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        # Изменен состав уроков курса
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            bump_course_versions([instance.pk])
+    elif action in ('post_add', 'post_remove'):
+        # Урок добавлен в курсы или удален из них
+        bump_course_versions(pk_set)
+    elif action == 'pre_clear':
+        bump_course_versions(instance.course_set.values_list('pk', flat=True))
+
+
+@receiver(pre_delete, sender=Lesson)
+def lesson_deleted(sender, instance, **kwargs):
+    # Удаление урока убирает его из курсов без сигнала m2m_changed
+    bump_course_versions(instance.course_set.values_list('pk', flat=True))
@@ -1,5 +1,36 @@
-from celery import shared_task
-from django.core.mail import send_mail
+import logging
+
+from celery import shared_task, current_app
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import EmailMessage
+from django.db import transaction
+from django.utils import timezone
+
+from config.mail import email_connection
+from courses.models.course import Course, CourseSubscription
+from courses.models.outbox import NotificationOutbox
+from courses.services import enqueue_notification, OUTBOX_STATS_KEY
+
+logger = logging.getLogger(__name__)
+
+COURSE_NOTIFICATION_PENDING_KEY = 'courses:{course_id}:notification:pending'
+
+
+def schedule_course_update_notification(course_id):
+    """
+    Планирует уведомление об обновлении курса через COURSE_NOTIFICATION_DEBOUNCE_WINDOW секунд.
+    Повторные обновления в пределах окна схлопываются в одну рассылку: задача читает курс
+    в момент выполнения, поэтому подписчики получают уведомление о последнем состоянии.
+    """
+    window = settings.COURSE_NOTIFICATION_DEBOUNCE_WINDOW
+    key = COURSE_NOTIFICATION_PENDING_KEY.format(course_id=course_id)
+    if cache.get(key):
+        return
+    # Запись в outbox с dedup_key схлопывает обновления и откатывается вместе с транзакцией
+    if enqueue_notification(send_course_update_notification, course_id, countdown=window, dedup_key=key):
+        # Ключ живет дольше окна, чтобы задержка воркера не приводила к повторной рассылке
+        transaction.on_commit(lambda: cache.add(key, True, timeout=window * 2))
 
 
 @shared_task
@@ -8,7 +39,7 @@ def send_subscription_notification(user_email, course_name):
     message = f'Вы успешно подписались на курс "{course_name}". Спасибо за подписку!'
     from_email = None
     recipient_list = [user_email]
-    send_mail(subject, message, from_email, recipient_list)
+    email_connection.send_messages([EmailMessage(subject, message, from_email, recipient_list)])
 
 
 @shared_task
@@ -19,14 +50,105 @@ def send_unsubscription_notification(user_email, course_name):
     from_email = None
     recipient_list = [user_email]
 
-    send_mail(subject, message, from_email, recipient_list)
+    email_connection.send_messages([EmailMessage(subject, message, from_email, recipient_list)])
+
+
+@shared_task
+def send_bulk_subscription_notification(user_email, course_names):
+    """Одно письмо о подписке на несколько курсов"""
+    subject = 'Вы успешно подписались на курсы'
+    courses = ', '.join(f'"{name}"' for name in course_names)
+    message = f'Вы успешно подписались на курсы {courses}. Спасибо за подписку!'
+    email_connection.send_messages([EmailMessage(subject, message, None, [user_email])])
+
+
+@shared_task
+def send_bulk_unsubscription_notification(user_email, course_names):
+    """Одно письмо об отписке от нескольких курсов"""
+    subject = 'Вы успешно отписались от курсов'
+    courses = ', '.join(f'"{name}"' for name in course_names)
+    message = (f'Вы успешно отписались от курсов {courses}. '
+               f'Мы надеемся, что вы найдете другие интересные курсы у нас!')
+    email_connection.send_messages([EmailMessage(subject, message, None, [user_email])])
+
+
+@shared_task
+def send_course_update_notification(course_id, user_emails=None):
+    """Рассылает уведомление об обновлении курса, разбивая подписчиков на пачки фиксированного размера"""
+    if user_emails is not None:
+        # Сообщение в прежнем формате (course_name, user_emails), поставленное в очередь до обновления.
+        # Поддерживается один релиз, затем user_emails удаляется
+        send_course_update_notification_chunk(course_id, user_emails)
+        return
+    # Обновления, сделанные после этого момента, запланируют новую рассылку
+    cache.delete(COURSE_NOTIFICATION_PENDING_KEY.format(course_id=course_id))
+    course_name = Course.objects.filter(pk=course_id).values_list('name', flat=True).first()
+    if course_name is None:
+        return
+
+    chunk_size = settings.COURSE_NOTIFICATION_CHUNK_SIZE
+    user_emails = CourseSubscription.objects.filter(
+        course_id=course_id,
+        is_active=True,
+    ).values_list('user__email', flat=True).iterator(chunk_size=chunk_size)
+
+    chunk = []
+    for user_email in user_emails:
+        chunk.append(user_email)
+        if len(chunk) == chunk_size:
+            send_course_update_notification_chunk.delay(course_name, chunk)
+            chunk = []
+    if chunk:
+        send_course_update_notification_chunk.delay(course_name, chunk)
 
 
 @shared_task
-def send_course_update_notification(course_name, user_emails):
+def send_course_update_notification_chunk(course_name, user_emails):
     subject = 'Обновление курса'
     message = f'Курс "{course_name}" был обновлен. Проверьте новый материал!'
     from_email = None
-    recipient_list = user_emails  # Список адресов получателей
 
-    send_mail(subject, message, from_email, recipient_list)
+    # Отдельное письмо каждому получателю через переиспользуемое SMTP-соединение
+    email_connection.send_messages([
+        EmailMessage(subject, message, from_email, [user_email]) for user_email in user_emails
+    ])
+
+
+@shared_task
+def dispatch_notification_outbox():
+    """
+    Отправляет накопленные в outbox задачи в брокер пачками по NOTIFICATION_OUTBOX_BATCH_SIZE.
+    Доставка "как минимум один раз": при ошибке посреди пачки она будет отправлена повторно.
+    """
+    batch_size = settings.NOTIFICATION_OUTBOX_BATCH_SIZE
+    batch_sizes = []
+    max_lag = 0.0
+
+    while True:
+        now = timezone.now()
+        with transaction.atomic():
+            entries = list(
+                NotificationOutbox.objects.select_for_update(skip_locked=True).filter(
+                    available_at__lte=now
+                ).order_by('available_at', 'pk')[:batch_size]
+            )
+            for entry in entries:
+                current_app.send_task(entry.task, args=entry.args)
+            NotificationOutbox.objects.filter(pk__in=[entry.pk for entry in entries]).delete()
+
+        if entries:
+            batch_sizes.append(len(entries))
+            max_lag = max(max_lag, (now - entries[0].available_at).total_seconds())
+        if len(entries) < batch_size:
+            break
+
+    stats = {
+        'dispatched_at': timezone.now().isoformat(),
+        'batch_sizes': batch_sizes,
+        'dispatched': sum(batch_sizes),
+        'max_lag_seconds': max_lag,
+    }
+    cache.set(OUTBOX_STATS_KEY, stats, timeout=None)
+    logger.info('Notification outbox dispatched %s tasks in batches %s, max lag %.3fs',
+                stats['dispatched'], batch_sizes, max_lag)
+    return stats
@@ -0,0 +1,72 @@
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from courses.models.course import Course, CourseSubscription
+from courses.models.outbox import NotificationOutbox
+from courses.services import SUBSCRIPTIONS_KEY, get_subscribed_course_ids
+from courses.tasks import send_bulk_subscription_notification, send_bulk_unsubscription_notification
+from users.models import User
+
+
+class CourseBulkSubscriptionTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create(email='test@example.com', is_active=True)
+        self.client.force_authenticate(user=self.user)
+        self.courses = Course.objects.bulk_create(
+            Course(name=f'course_{i}', description='test_description') for i in range(50)
+        )
+        self.course_ids = [course.pk for course in self.courses]
+        # Одна подписка уже активна, одна отключена
+        CourseSubscription.objects.create(user=self.user, course=self.courses[0])
+        CourseSubscription.objects.create(user=self.user, course=self.courses[1], is_active=False)
+        self.cache_key = SUBSCRIPTIONS_KEY.format(user_id=self.user.pk)
+        get_subscribed_course_ids(self.user.pk)
+
+    def test_bulk_subscribe(self):
+        """
+        Тест пакетной подписки на 50 курсов: несколько запросов, одно уведомление, кеш подписок сброшен
+        """
+        with self.captureOnCommitCallbacks(execute=True), self.assertNumQueries(5):
+            response = self.client.post(reverse('courses:course-bulk-subscribe'),
+                                        {'course_ids': self.course_ids + [0]}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['subscribed'], sorted(self.course_ids[1:]))
+        self.assertEqual(response.data['already_subscribed'], [self.courses[0].pk])
+        self.assertEqual(response.data['not_found'], [0])
+        self.assertEqual(CourseSubscription.objects.filter(user=self.user, is_active=True).count(), 50)
+        entry = NotificationOutbox.objects.get()
+        self.assertEqual(entry.task, send_bulk_subscription_notification.name)
+        self.assertEqual(len(entry.args[1]), 49)
+        self.assertIsNone(cache.get(self.cache_key))
+        self.assertEqual(get_subscribed_course_ids(self.user.pk), set(self.course_ids))
+
+    def test_bulk_unsubscribe(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('courses:course-bulk-unsubscribe'),
+                                        {'course_ids': self.course_ids[:3]}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['unsubscribed'], [self.courses[0].pk])
+        self.assertEqual(response.data['not_subscribed'], sorted(self.course_ids[1:3]))
+        self.assertFalse(CourseSubscription.objects.filter(user=self.user, is_active=True).exists())
+        entry = NotificationOutbox.objects.get()
+        self.assertEqual(entry.task, send_bulk_unsubscription_notification.name)
+        self.assertEqual(entry.args, [self.user.email, [self.courses[0].name]])
+        self.assertIsNone(cache.get(self.cache_key))
+        self.assertEqual(get_subscribed_course_ids(self.user.pk), set())
+
+    def test_nothing_to_change(self):
+        response = self.client.post(reverse('courses:course-bulk-unsubscribe'),
+                                    {'course_ids': self.course_ids[1:3]}, format='json')
+
+        self.assertEqual(response.data['unsubscribed'], [])
+        self.assertFalse(NotificationOutbox.objects.exists())
+
+    def test_validation(self):
+        response = self.client.post(reverse('courses:course-bulk-subscribe'), {'course_ids': []}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
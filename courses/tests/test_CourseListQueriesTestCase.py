@@ -0,0 +1,58 @@
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from courses.models.course import Course, CourseSubscription
+from courses.models.lesson import Lesson
+from users.models import User
+
+
+class CourseListQueriesTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(
+            email='test@example.com',
+            is_active=True,
+            is_staff=True,
+            is_superuser=True
+        )
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('courses:courses-list')
+        self.lesson = Lesson.objects.create(name='Test Lesson', description='Test Description')
+
+    def create_courses(self, count):
+        courses = Course.objects.bulk_create(
+            Course(name=f'Course {i}', description='Test Description') for i in range(count)
+        )
+        for course in courses:
+            course.lessons.add(self.lesson)
+        CourseSubscription.objects.bulk_create(
+            CourseSubscription(user=self.user, course=course) for course in courses[::2]
+        )
+
+    def test_list_values_from_annotations(self):
+        """
+        Тест значений lessons_count и is_subscribed, полученных из аннотаций
+        """
+        self.create_courses(2)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results']
+        self.assertEqual([course['lessons_count'] for course in results], [1, 1])
+        self.assertEqual([course['is_subscribed'] for course in results], [True, False])
+
+    def test_list_query_count_is_constant(self):
+        """
+        Тест, чтобы проверить, что количество запросов не зависит от количества курсов
+        """
+        self.create_courses(10)
+        # count, курсы с аннотациями, prefetch уроков
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.data['results']), 10)
+
+        self.create_courses(300)
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url, {'page': 20})
+        self.assertEqual(len(response.data['results']), 10)
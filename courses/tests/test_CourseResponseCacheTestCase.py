@@ -0,0 +1,97 @@
+from django.core.cache import cache
+from django.test import TransactionTestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from courses.models.course import Course, CourseSubscription
+from courses.models.lesson import Lesson
+from users.models import User
+
+
+class CourseResponseCacheTestCase(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create(email='test@example.com', is_active=True, is_staff=True)
+        self.client.force_authenticate(user=self.user)
+        self.course = Course.objects.create(name='Test Course', description='Test Description')
+        self.list_url = reverse('courses:courses-list')
+        self.detail_url = reverse('courses:courses-detail', kwargs={'pk': self.course.pk})
+
+    def test_not_modified(self):
+        """
+        Тест ответа 304 на If-None-Match с актуальным ETag
+        """
+        for url in (self.list_url, self.detail_url):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            etag = response['ETag']
+
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+            self.assertEqual(response['ETag'], etag)
+
+    def test_cached_response_skips_serialization(self):
+        self.client.get(self.list_url)
+        # Ответ берется из кеша без запросов к БД (force_authenticate не загружает пользователя)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.list_url)
+        self.assertEqual(response.data['results'][0]['name'], 'Test Course')
+
+    def test_course_update_invalidates(self):
+        """
+        Тест инвалидации кеша при обновлении курса
+        """
+        etag = self.client.get(self.detail_url)['ETag']
+        list_etag = self.client.get(self.list_url)['ETag']
+
+        self.client.patch(self.detail_url, {'name': 'Updated Course'})
+
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['name'], 'Updated Course')
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=list_etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_lesson_membership_invalidates(self):
+        """
+        Тест инвалидации кеша при изменении состава уроков курса
+        """
+        etag = self.client.get(self.detail_url)['ETag']
+        lesson = Lesson.objects.create(name='Test Lesson', description='Test Description')
+
+        self.course.lessons.add(lesson)
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['lessons_count'], 1)
+
+        lesson.delete()
+        response = self.client.get(self.detail_url)
+        self.assertEqual(response.data['lessons_count'], 0)
+
+    def test_subscription_invalidates(self):
+        """
+        Тест инвалидации кеша при изменении подписок пользователя
+        """
+        etag = self.client.get(self.detail_url)['ETag']
+
+        CourseSubscription.objects.create(user=self.user, course=self.course)
+
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['is_subscribed'])
+
+    def test_users_do_not_share_cached_response(self):
+        """
+        Тест разделения кеша по пользователям при совпадающих версиях подписок
+        """
+        other = User.objects.create(email='other@example.com', is_active=True, is_staff=True)
+        CourseSubscription.objects.create(user=self.user, course=self.course)
+        # Одинаковые счетчики версий подписок у обоих пользователей
+        cache.set(f'subscriptions:{self.user.pk}:version', 1, timeout=None)
+        cache.set(f'subscriptions:{other.pk}:version', 1, timeout=None)
+        self.assertTrue(self.client.get(self.detail_url).data['is_subscribed'])
+
+        self.client.force_authenticate(user=other)
+        self.assertFalse(self.client.get(self.detail_url).data['is_subscribed'])
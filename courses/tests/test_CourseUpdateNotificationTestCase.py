@@ -0,0 +1,72 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.core import mail
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from courses.models.course import Course, CourseSubscription
+from courses.models.outbox import NotificationOutbox
+from courses.tasks import send_course_update_notification, send_course_update_notification_chunk, \
+    schedule_course_update_notification
+from users.models import User
+
+
+@override_settings(COURSE_NOTIFICATION_CHUNK_SIZE=2, COURSE_NOTIFICATION_DEBOUNCE_WINDOW=300)
+class CourseUpdateNotificationTestCase(TestCase):
+    def setUp(self):
+        self.course = Course.objects.create(name='Test Course', description='Test Description')
+        for i in range(5):
+            user = User.objects.create(email=f'user{i}@example.com')
+            CourseSubscription.objects.create(user=user, course=self.course, is_active=i != 4)
+
+    @patch('courses.tasks.send_course_update_notification_chunk.delay')
+    def test_fan_out_in_chunks(self, mock_delay):
+        """
+        Тест разбиения активных подписчиков на пачки
+        """
+        send_course_update_notification(self.course.pk)
+
+        chunks = [call.args[1] for call in mock_delay.call_args_list]
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 2])
+        self.assertEqual(sorted(sum(chunks, [])), [f'user{i}@example.com' for i in range(4)])
+        self.assertTrue(all(call.args[0] == self.course.name for call in mock_delay.call_args_list))
+
+    def test_chunk_sends_individual_messages(self):
+        """
+        Тест отправки отдельного письма каждому получателю пачки
+        """
+        send_course_update_notification_chunk(self.course.name, ['user0@example.com', 'user1@example.com'])
+
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual([message.to for message in mail.outbox], [['user0@example.com'], ['user1@example.com']])
+
+    def test_legacy_arguments(self):
+        """
+        Тест сообщения в прежнем формате (course_name, user_emails), поставленного до обновления
+        """
+        send_course_update_notification(self.course.name, ['user0@example.com'])
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn(self.course.name, mail.outbox[0].body)
+
+    def test_repeated_updates_are_coalesced(self):
+        """
+        Тест схлопывания повторных обновлений курса в одну отложенную рассылку
+        """
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            for _ in range(3):
+                schedule_course_update_notification(self.course.pk)
+
+        entry = NotificationOutbox.objects.get()
+        self.assertEqual(entry.task, send_course_update_notification.name)
+        self.assertEqual(entry.args, [self.course.pk])
+        self.assertEqual(entry.available_at - entry.created_at, timedelta(seconds=300))
+
+        # После выполнения рассылки следующее обновление планирует новую
+        entry.delete()
+        with patch('courses.tasks.send_course_update_notification_chunk.delay'):
+            send_course_update_notification(self.course.pk)
+        schedule_course_update_notification(self.course.pk)
+        self.assertEqual(NotificationOutbox.objects.count(), 1)
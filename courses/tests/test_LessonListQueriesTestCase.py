@@ -0,0 +1,62 @@
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from courses.models.course import Course, CourseSubscription
+from courses.models.lesson import Lesson
+from users.models import User
+
+
+class LessonListQueriesTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(
+            email='test@example.com',
+            is_active=True,
+            is_staff=True,
+            is_superuser=True
+        )
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('courses:lesson-list')
+
+        self.course = Course.objects.create(name='Test Course', description='Test Description')
+        CourseSubscription.objects.create(user=self.user, course=self.course)
+        for i in range(10):
+            lesson = Lesson.objects.create(name=f'Lesson {i}', description='Test Description')
+            lesson.courses.add(self.course)
+            self.course.lessons.add(lesson)
+
+    def test_list_compact_courses(self):
+        """
+        Тест режима ?compact=courses: у урока только id курсов
+        """
+        # count, уроки, id курсов
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url, {'compact': 'courses'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['courses'], [self.course.pk])
+
+    def test_list_nested_courses_by_default(self):
+        """
+        Тест представления по умолчанию: вложенные курсы без дополнительных запросов на каждый урок
+        """
+        # count, уроки, курсы с аннотациями, уроки курсов
+        with self.assertNumQueries(4):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        course = response.data['results'][0]['courses'][0]
+        self.assertEqual(course['id'], self.course.pk)
+        self.assertEqual(course['lessons_count'], 10)
+        self.assertTrue(course['is_subscribed'])
+
+    def test_retrieve_nested_and_compact_courses(self):
+        lesson = Lesson.objects.first()
+        url = reverse('courses:lesson-get', args=[lesson.pk])
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['courses'][0]['name'], self.course.name)
+
+        response = self.client.get(url, {'compact': 'courses'})
+        self.assertEqual(response.data['courses'], [self.course.pk])
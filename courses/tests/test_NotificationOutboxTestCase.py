@@ -0,0 +1,78 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from courses.models.course import Course
+from courses.models.outbox import NotificationOutbox
+from courses.services import enqueue_notification, get_outbox_stats
+from courses.tasks import dispatch_notification_outbox, send_subscription_notification, \
+    send_unsubscription_notification
+from users.models import User
+
+
+class NotificationOutboxViewsTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(email='test@example.com', is_active=True)
+        self.client.force_authenticate(user=self.user)
+        self.course = Course.objects.create(name='test_course', description='test_description')
+
+    @patch('courses.tasks.send_subscription_notification.delay')
+    def test_subscribe_writes_outbox(self, mock_delay):
+        """
+        Тест записи уведомления о подписке в outbox вместо отправки в брокер
+        """
+        response = self.client.post(reverse('courses:course-subscribe', args=[self.course.id]))
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        mock_delay.assert_not_called()
+        entry = NotificationOutbox.objects.get()
+        self.assertEqual(entry.task, send_subscription_notification.name)
+        self.assertEqual(entry.args, [self.user.email, self.course.name])
+
+    def test_unsubscribe_writes_outbox(self):
+        self.client.post(reverse('courses:course-subscribe', args=[self.course.id]))
+        self.client.delete(reverse('courses:course-unsubscribe', args=[self.course.id]))
+
+        self.assertEqual(
+            list(NotificationOutbox.objects.order_by('pk').values_list('task', flat=True)),
+            [send_subscription_notification.name, send_unsubscription_notification.name]
+        )
+
+
+@override_settings(NOTIFICATION_OUTBOX_BATCH_SIZE=2)
+class DispatchNotificationOutboxTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    @patch('courses.tasks.current_app.send_task')
+    def test_dispatch_in_batches(self, mock_send_task):
+        """
+        Тест отправки готовых задач пачками и сбора метрик
+        """
+        for i in range(5):
+            enqueue_notification(send_subscription_notification, f'user{i}@example.com', 'test_course')
+        enqueue_notification(send_subscription_notification, 'later@example.com', 'test_course', countdown=60)
+
+        stats = dispatch_notification_outbox()
+
+        self.assertEqual(mock_send_task.call_count, 5)
+        mock_send_task.assert_any_call(send_subscription_notification.name,
+                                       args=['user0@example.com', 'test_course'])
+        self.assertEqual(stats['batch_sizes'], [2, 2, 1])
+        self.assertEqual(NotificationOutbox.objects.count(), 1)
+        self.assertEqual(get_outbox_stats()['pending'], 1)
+
+    @patch('courses.tasks.current_app.send_task')
+    def test_lag(self, mock_send_task):
+        entry = enqueue_notification(send_subscription_notification, 'user@example.com', 'test_course')
+        NotificationOutbox.objects.filter(pk=entry.pk).update(available_at=timezone.now() - timedelta(seconds=30))
+
+        self.assertGreaterEqual(get_outbox_stats()['lag_seconds'], 30)
+        stats = dispatch_notification_outbox()
+        self.assertGreaterEqual(stats['max_lag_seconds'], 30)
@@ -0,0 +1,53 @@
+import smtplib
+from unittest.mock import patch, MagicMock
+
+from django.test import SimpleTestCase, override_settings
+
+from config.mail import PooledEmailConnection
+
+
+@override_settings(EMAIL_CONNECTION_IDLE_TIMEOUT=60, EMAIL_CONNECTION_MAX_MESSAGES=3)
+class PooledEmailConnectionTestCase(SimpleTestCase):
+    def setUp(self):
+        patcher = patch('config.mail.get_connection', side_effect=lambda **kwargs: MagicMock())
+        self.mock_get_connection = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.connection = PooledEmailConnection()
+
+    def test_connection_is_reused(self):
+        """
+        Тест переиспользования соединения между отправками
+        """
+        self.connection.send_messages(['message'])
+        self.connection.send_messages(['message'])
+
+        self.assertEqual(self.mock_get_connection.call_count, 1)
+
+    def test_max_messages_per_connection(self):
+        """
+        Тест пересоздания соединения после лимита писем
+        """
+        self.connection.send_messages(['message'] * 7)
+
+        self.assertEqual(self.mock_get_connection.call_count, 3)
+
+    @patch('config.mail.time.monotonic')
+    def test_idle_timeout(self, mock_monotonic):
+        mock_monotonic.return_value = 1000
+        self.connection.send_messages(['message'])
+        mock_monotonic.return_value = 1061
+        self.connection.send_messages(['message'])
+
+        self.assertEqual(self.mock_get_connection.call_count, 2)
+
+    def test_reconnect_on_disconnect(self):
+        """
+        Тест повторной отправки через новое соединение при обрыве связи
+        """
+        self.connection.send_messages(['message'])
+        self.connection.connection.send_messages.side_effect = smtplib.SMTPServerDisconnected()
+
+        self.connection.send_messages(['message'])
+
+        self.assertEqual(self.mock_get_connection.call_count, 2)
+        self.connection.connection.send_messages.assert_called_once_with(['message'])
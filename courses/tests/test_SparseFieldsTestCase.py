@@ -0,0 +1,62 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from courses.models.course import Course
+from courses.models.lesson import Lesson
+from users.models import User
+
+
+class SparseFieldsTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(
+            email='test@example.com',
+            is_active=True,
+            is_staff=True,
+            is_superuser=True
+        )
+        self.client.force_authenticate(user=self.user)
+        self.course = Course.objects.create(name='Test Course', description='Test Description')
+        self.lesson = Lesson.objects.create(name='Test Lesson', description='Lesson Description')
+        self.lesson.courses.add(self.course)
+
+    def test_fields(self):
+        """
+        Тест ?fields=: в выдаче и в SELECT только запрошенные поля
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('courses:courses-list'), {'fields': 'id,name,lessons_count'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data['results'][0]), {'id', 'name', 'lessons_count'})
+        self.assertFalse(any('"description"' in query['sql'] for query in queries))
+
+    def test_omit(self):
+        """
+        Тест ?omit=: поля убраны из выдачи и из SELECT
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('courses:lesson-get', args=[self.lesson.pk]),
+                                       {'omit': 'description,preview', 'compact': 'courses'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('description', response.data)
+        self.assertNotIn('preview', response.data)
+        self.assertEqual(response.data['name'], self.lesson.name)
+        self.assertFalse(any('"description"' in query['sql'] for query in queries))
+
+    def test_nested_serializer_is_not_trimmed(self):
+        response = self.client.get(reverse('courses:lesson-list'), {'fields': 'id,courses'})
+
+        lesson = response.data['results'][0]
+        self.assertEqual(set(lesson), {'id', 'courses'})
+        self.assertEqual(lesson['courses'][0]['description'], self.course.description)
+
+    def test_write_ignores_fields(self):
+        url = reverse('courses:courses-detail', kwargs={'pk': self.course.pk})
+        response = self.client.patch(f'{url}?fields=id', {'name': 'Updated Course'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['name'], 'Updated Course')
@@ -0,0 +1,59 @@
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from courses.models.course import Course, CourseSubscription
+from courses.models.outbox import NotificationOutbox
+from courses.services import subscribe_courses, unsubscribe_courses
+from users.models import User
+
+
+class SubscriptionUpsertTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(email='test@example.com', is_active=True)
+        self.client.force_authenticate(user=self.user)
+        self.course = Course.objects.create(name='test_course', description='test_description')
+        self.subscribe_url = reverse('courses:course-subscribe', args=[self.course.pk])
+        self.unsubscribe_url = reverse('courses:course-unsubscribe', args=[self.course.pk])
+
+    def test_resubscribe_after_unsubscribe(self):
+        """
+        Тест повторной подписки после отписки: отключенная подписка включается, а не создается заново
+        """
+        self.client.post(self.subscribe_url)
+        self.client.delete(self.unsubscribe_url)
+
+        response = self.client.post(self.subscribe_url)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        subscription = CourseSubscription.objects.get(user=self.user, course=self.course)
+        self.assertTrue(subscription.is_active)
+        self.assertEqual(NotificationOutbox.objects.count(), 3)
+
+    def test_notifications_only_on_transition(self):
+        """
+        Тест уведомлений: повторные подписка и отписка не меняют состояние и не создают уведомлений
+        """
+        self.client.post(self.subscribe_url)
+        response = self.client.post(self.subscribe_url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.client.delete(self.unsubscribe_url)
+        response = self.client.delete(self.unsubscribe_url)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        self.assertEqual(NotificationOutbox.objects.count(), 2)
+
+    def test_unsubscribe_without_subscription(self):
+        response = self.client.delete(self.unsubscribe_url)
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(NotificationOutbox.objects.exists())
+
+    def test_upsert_returns_changed_courses(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(subscribe_courses(self.user.pk, [self.course.pk]), {self.course.pk})
+        self.assertEqual(subscribe_courses(self.user.pk, [self.course.pk]), set())
+        self.assertEqual(unsubscribe_courses(self.user.pk, [self.course.pk]), {self.course.pk})
+        self.assertEqual(unsubscribe_courses(self.user.pk, [self.course.pk]), set())
+        self.assertEqual(subscribe_courses(self.user.pk, [self.course.pk]), {self.course.pk})
@@ -0,0 +1,72 @@
+from django.core.cache import cache
+from django.test import TransactionTestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from courses.models.course import Course, CourseSubscription
+from courses.services import SUBSCRIPTIONS_KEY, get_subscribed_course_ids, get_subscriptions_cache_stats, \
+    get_subscriptions_version
+from users.models import User
+
+
+class SubscriptionsCacheTestCase(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create(email='test@example.com', is_active=True)
+        self.client.force_authenticate(user=self.user)
+        self.course = Course.objects.create(name='test_course', description='test_description')
+
+    def test_lazy_load_and_counters(self):
+        """
+        Тест ленивой загрузки множества подписок и счетчиков попаданий/промахов
+        """
+        CourseSubscription.objects.create(user=self.user, course=self.course)
+
+        self.assertEqual(get_subscribed_course_ids(self.user.pk), {self.course.pk})
+        with self.assertNumQueries(0):
+            self.assertEqual(get_subscribed_course_ids(self.user.pk), {self.course.pk})
+
+        stats = get_subscriptions_cache_stats()
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['hit_rate'], 0.5)
+
+    def test_subscribe_and_unsubscribe_update_cache(self):
+        """
+        Тест сброса закешированного множества при подписке и отписке
+        """
+        self.assertEqual(get_subscribed_course_ids(self.user.pk), set())
+
+        response = self.client.post(reverse('courses:course-subscribe', args=[self.course.id]))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        # Множество сброшено: перечитывается из БД одним запросом
+        with self.assertNumQueries(1):
+            self.assertEqual(get_subscribed_course_ids(self.user.pk), {self.course.pk})
+
+        response = self.client.post(reverse('courses:course-subscribe', args=[self.course.id]))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.delete(reverse('courses:course-unsubscribe', args=[self.course.id]))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        with self.assertNumQueries(1):
+            self.assertEqual(get_subscribed_course_ids(self.user.pk), set())
+
+    def test_delete_subscription_updates_cache(self):
+        subscription = CourseSubscription.objects.create(user=self.user, course=self.course)
+        self.assertEqual(get_subscribed_course_ids(self.user.pk), {self.course.pk})
+
+        subscription.delete()
+
+        self.assertEqual(get_subscribed_course_ids(self.user.pk), set())
+
+    def test_stale_set_from_concurrent_read_is_not_used(self):
+        """
+        Тест гонки: множество, прочитанное до изменения подписок и записанное в кеш после сброса, не используется
+        """
+        stale_version = get_subscriptions_version(self.user.pk)
+        self.client.post(reverse('courses:course-subscribe', args=[self.course.id]))
+        cache.set(SUBSCRIPTIONS_KEY.format(user_id=self.user.pk), (stale_version, set()))
+
+        self.assertEqual(get_subscribed_course_ids(self.user.pk), {self.course.pk})
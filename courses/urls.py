@@ -3,7 +3,8 @@ from rest_framework.routers import DefaultRouter
 
 from courses.apps import CoursesConfig
 from courses.views import CourseViewSet, LessonCreateAPIView, LessonListAPIView, LessonRetrieveAPIView, \
-    LessonUpdateAPIView, LessonDestroyAPIView, CourseSubscribeAPIView, CourseUnsubscribeAPIView
+    LessonUpdateAPIView, LessonDestroyAPIView, CourseSubscribeAPIView, CourseUnsubscribeAPIView, \
+    CourseBulkSubscribeAPIView, CourseBulkUnsubscribeAPIView
 
 app_name = CoursesConfig.name
 
@@ -20,4 +21,7 @@ urlpatterns = [
                   path('courses/<int:pk>/subscribe/', CourseSubscribeAPIView.as_view(), name='course-subscribe'),
                   path('courses/<int:course_id>/unsubscribe/', CourseUnsubscribeAPIView.as_view(),
                        name='course-unsubscribe'),
+                  path('courses/bulk/subscribe/', CourseBulkSubscribeAPIView.as_view(), name='course-bulk-subscribe'),
+                  path('courses/bulk/unsubscribe/', CourseBulkUnsubscribeAPIView.as_view(),
+                       name='course-bulk-unsubscribe'),
               ] + router.urls
@@ -1,39 +1,46 @@
+from django.db import transaction
 from django.utils import timezone
 from rest_framework import viewsets, generics, status
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from courses.models.course import Course, CourseSubscription
+from courses.models.course import Course
+from config.pagination import SwitchablePagination
+from config.sparse_fields import SparseFieldsViewMixin
+from courses.mixins import CourseResponseCacheMixin, LessonPrefetchMixin
 from courses.models.lesson import Lesson
 from courses.permissions import IsOwner, IsModerator
-from courses.serializer.course import CourseSerializer, CourseSubscriptionSerializer
+from courses.serializer.course import CourseSerializer, CourseSubscriptionSerializer, CourseIdsSerializer
 from courses.serializer.lesson import LessonSerializer
-from .tasks import send_subscription_notification, send_unsubscription_notification, send_course_update_notification
+from courses.services import enqueue_notification, subscribe_courses, unsubscribe_courses
+from .tasks import send_subscription_notification, send_unsubscription_notification, \
+    schedule_course_update_notification, send_bulk_subscription_notification, send_bulk_unsubscription_notification
 
 
-class CourseViewSet(viewsets.ModelViewSet):
+class CourseViewSet(CourseResponseCacheMixin, SparseFieldsViewMixin, viewsets.ModelViewSet):
     serializer_class = CourseSerializer
     queryset = Course.objects.all()
     permission_classes = [IsOwner | IsModerator | IsAdminUser]  # Применяем разрешения
+    sparse_required_fields = ('owner',)
+    pagination_class = SwitchablePagination
+    ordering = ('id',)
 
+    def get_queryset(self):
+        # Количество уроков и подписка считаются в одном запросе вместо 2N запросов из сериализатора
+        return Course.objects.with_stats(self.request.user).order_by('pk')
+
+    @transaction.atomic
     def perform_update(self, serializer):
         instance = serializer.save()
         # Обновляем дату последнего обновления курса
         instance.last_updated = timezone.now()
         instance.save()
+        # Аннотация из get_queryset могла устареть после изменения списка уроков
+        instance.__dict__.pop('lessons_count', None)
 
-        # Получаем список пользователей, подписанных на этот курс
-        subscriptions = CourseSubscription.objects.filter(
-            course=instance,
-            is_active=True
-        )
-
-        # Создаем список адресов электронной почты пользователей
-        user_emails = [subscription.user.email for subscription in subscriptions]
-
-        # Запускаем задачу отправки уведомления об обновлении курса
-        send_course_update_notification.delay(instance.name, user_emails)
+        # Планируем уведомление об обновлении курса, повторные сохранения в пределах окна схлопываются
+        schedule_course_update_notification(instance.pk)
 
 
 class LessonCreateAPIView(generics.CreateAPIView):
@@ -41,16 +48,19 @@ class LessonCreateAPIView(generics.CreateAPIView):
     permission_classes = [IsOwner | IsAdminUser]  # Применяем разрешения
 
 
-class LessonListAPIView(generics.ListAPIView):
+class LessonListAPIView(SparseFieldsViewMixin, LessonPrefetchMixin, generics.ListAPIView):
     serializer_class = LessonSerializer
     queryset = Lesson.objects.all()
     permission_classes = [IsOwner | IsModerator | IsAdminUser]  # Применяем разрешения
+    pagination_class = SwitchablePagination
+    ordering = ('id',)
 
 
-class LessonRetrieveAPIView(generics.RetrieveAPIView):
+class LessonRetrieveAPIView(SparseFieldsViewMixin, LessonPrefetchMixin, generics.RetrieveAPIView):
     serializer_class = LessonSerializer
     queryset = Lesson.objects.all()
     permission_classes = [IsOwner | IsModerator | IsAdminUser]  # Применяем разрешения
+    sparse_required_fields = ('owner',)
 
 
 class LessonUpdateAPIView(generics.UpdateAPIView):
@@ -76,15 +86,13 @@ class CourseSubscribeAPIView(generics.CreateAPIView):
         course = self.get_object()  # Получаем объект курса из URL
         user = request.user
 
-        # Проверяем не подписан ли пользователь уже на этот курс
-        if CourseSubscription.objects.filter(user=user, course=course, is_active=True).exists():
-            return Response({"detail": "Вы уже подписаны на этот курс."}, status=status.HTTP_400_BAD_REQUEST)
-        # Создаем подписку
-        subscription = CourseSubscription(user=user, course=course)
-        subscription.save()
+        with transaction.atomic():
+            # Создаем подписку или включаем отключенную; активная подписка не меняется
+            if not subscribe_courses(user.pk, [course.pk]):
+                return Response({"detail": "Вы уже подписаны на этот курс."}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Отправляем уведомление об успешной подписке пользователю
-        send_subscription_notification.delay(user.email, course.name)
+            # Уведомление об успешной подписке уходит через outbox в той же транзакции
+            enqueue_notification(send_subscription_notification, user.email, course.name)
 
         return Response({"detail": "Подписка успешно установлена."}, status=status.HTTP_201_CREATED)
 
@@ -96,11 +104,56 @@ class CourseUnsubscribeAPIView(APIView):
     def delete(request, course_id):
         user = request.user
         # Устанавливаем подписку как неактивную вместо фактического удаления
-        subscription = CourseSubscription.objects.filter(course=course_id, user=user).first()
-        subscription.is_active = False
-        subscription.save()
-
-        # Отправляем уведомление об успешной отписке пользователю
-        send_unsubscription_notification.delay(subscription.user.email, subscription.course.name)
+        with transaction.atomic():
+            if unsubscribe_courses(user.pk, [course_id]):
+                # Уведомление только при реальной отписке; уходит через outbox в той же транзакции
+                course_name = Course.objects.filter(pk=course_id).values_list('name', flat=True).first()
+                enqueue_notification(send_unsubscription_notification, user.email, course_name)
 
         return Response({"detail": "Вы отписаны."}, status=status.HTTP_204_NO_CONTENT)
+
+
+class CourseBulkSubscribeAPIView(APIView):
+    """Подписка на несколько курсов одним запросом: пакетная запись и одно уведомление"""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = CourseIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = request.user
+
+        course_names = dict(
+            Course.objects.filter(pk__in=serializer.validated_data['course_ids']).values_list('pk', 'name')
+        )
+        with transaction.atomic():
+            subscribed = subscribe_courses(user.pk, course_names.keys())
+            if subscribed:
+                enqueue_notification(send_bulk_subscription_notification, user.email,
+                                     [course_names[course_id] for course_id in sorted(subscribed)])
+
+        return Response({
+            'subscribed': sorted(subscribed),
+            'already_subscribed': sorted(course_names.keys() - subscribed),
+            'not_found': sorted(set(serializer.validated_data['course_ids']) - course_names.keys()),
+        }, status=status.HTTP_200_OK)
+
+
+class CourseBulkUnsubscribeAPIView(APIView):
+    """Отписка от нескольких курсов одним запросом: один UPDATE и одно уведомление"""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = CourseIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = request.user
+
+        with transaction.atomic():
+            unsubscribed = unsubscribe_courses(user.pk, serializer.validated_data['course_ids'])
+            if unsubscribed:
+                course_names = Course.objects.filter(pk__in=unsubscribed).order_by('pk').values_list('name', flat=True)
+                enqueue_notification(send_bulk_unsubscription_notification, user.email, list(course_names))
+
+        return Response({
+            'unsubscribed': sorted(unsubscribed),
+            'not_subscribed': sorted(set(serializer.validated_data['course_ids']) - unsubscribed),
+        }, status=status.HTTP_200_OK)
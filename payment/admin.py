@@ -1,5 +1,8 @@
 from django.contrib import admin
 
-from payment.models import Payment
+from payment.models import Payment, PaymentLedgerEntry, RevenueRollup, UserPaymentSummary
 
 admin.site.register(Payment)
+admin.site.register(RevenueRollup)
+admin.site.register(PaymentLedgerEntry)
+admin.site.register(UserPaymentSummary)
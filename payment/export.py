@@ -0,0 +1,61 @@
+import csv
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+# Колонки выгрузки; пользователь выводится email-ом, как в StringRelatedField списка платежей
+PAYMENT_EXPORT_FIELDS = (
+    'id', 'user', 'payment_date', 'paid_course', 'paid_lesson', 'payment_amount', 'payment_method',
+    'stripe_id', 'stripe_status',
+)
+PAYMENT_EXPORT_COLUMNS = (
+    'id', 'user__email', 'payment_date', 'paid_course_id', 'paid_lesson_id', 'payment_amount', 'payment_method',
+    'stripe_id', 'stripe_status',
+)
+
+
+class Echo:
+    """Псевдобуфер для csv.writer: возвращает строку вместо записи в файл"""
+
+    def write(self, value):
+        return value
+
+
+def iter_payment_rows(queryset, chunk_size=None):
+    """
+    Строки платежей курсором на стороне сервера (на PostgreSQL), не загружая выборку в память.
+    Email пользователя берется JOIN-ом в том же запросе.
+    """
+    return queryset.values_list(*PAYMENT_EXPORT_COLUMNS).iterator(
+        chunk_size=chunk_size or settings.PAYMENT_EXPORT_CHUNK_SIZE
+    )
+
+
+def iter_csv(rows, rows_per_chunk=500):
+    writer = csv.writer(Echo())
+    chunk = [writer.writerow(PAYMENT_EXPORT_FIELDS)]
+    for row in rows:
+        chunk.append(writer.writerow(['' if value is None else value for value in row]))
+        # Отдаем ответ фрагментами по несколько строк, а не построчно
+        if len(chunk) >= rows_per_chunk:
+            yield ''.join(chunk)
+            chunk = []
+    yield ''.join(chunk)
+
+
+def iter_jsonl(rows, rows_per_chunk=500):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    chunk = []
+    for row in rows:
+        chunk.append(encoder.encode(dict(zip(PAYMENT_EXPORT_FIELDS, row))) + '\n')
+        if len(chunk) >= rows_per_chunk:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv; charset=utf-8', iter_csv),
+    'jsonl': ('application/x-ndjson; charset=utf-8', iter_jsonl),
+}
@@ -0,0 +1,288 @@
+import csv
+import io
+import json
+import time
+
+from django.conf import settings
+from django.core import serializers
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from courses.models.course import Course
+from courses.models.lesson import Lesson
+from payment.models import Payment, PaymentMethod
+from payment.services import add_payments_to_revenue_rollup, append_payments_to_ledger
+from users.models import User
+
+PAYMENT_MODEL_LABEL = 'payment.payment'
+
+# Колонки, которые заполняет импорт (служебные поля Stripe остаются пустыми)
+PAYMENT_IMPORT_FIELDS = (
+    'id', 'user', 'payment_date', 'paid_course', 'paid_lesson', 'payment_amount', 'payment_method', 'stripe_id',
+)
+PAYMENT_METHODS = {tag.name for tag in PaymentMethod}
+
+
+def iter_json_records(stream, chunk_size=64 * 1024):
+    """
+    Потоково читает записи из JSON-массива или JSONL, не загружая файл целиком.
+    В памяти держится только текущий фрагмент файла.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    pos = 0
+    eof = False
+    is_array = None
+
+    while True:
+        # Пропускаем пробелы и разделители элементов
+        while pos < len(buffer) and (buffer[pos].isspace() or (is_array and buffer[pos] == ',')):
+            pos += 1
+
+        if pos == len(buffer):
+            if eof:
+                return
+            chunk = stream.read(chunk_size)
+            eof = not chunk
+            buffer, pos = chunk, 0
+            continue
+
+        if is_array is None:
+            is_array = buffer[pos] == '['
+            pos += is_array
+            continue
+        if is_array and buffer[pos] == ']':
+            return
+
+        try:
+            record, pos = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            # Запись не поместилась в прочитанный фрагмент: дочитываем файл
+            chunk = stream.read(chunk_size)
+            eof = not chunk
+            buffer, pos = buffer[pos:] + chunk, 0
+            continue
+        yield record
+
+
+class ForeignKeyResolver:
+    """Проверяет существование связанных объектов пачкой запросов, запоминая найденные id"""
+
+    def __init__(self, model, max_size=100_000):
+        self.model = model
+        self.max_size = max_size
+        self.known_ids = set()
+
+    def resolve(self, ids):
+        """Возвращает существующие id из переданных"""
+        ids = {pk for pk in ids if pk is not None}
+        missing = ids - self.known_ids
+        if missing:
+            if len(self.known_ids) + len(missing) > self.max_size:
+                # После очистки id пачки, найденные ранее, тоже запрашиваются заново
+                self.known_ids.clear()
+                missing = ids
+            self.known_ids.update(self.model.objects.filter(pk__in=missing).values_list('pk', flat=True))
+        return ids & self.known_ids
+
+
+class PaymentImporter:
+    """
+    Импорт платежей из JSON/JSONL пачками: bulk-вставка или COPY на PostgreSQL.
+    Записи других моделей (формат фикстур Django) сохраняются по одной, как в loaddata.
+    """
+
+    def __init__(self, batch_size=settings.PAYMENT_IMPORT_BATCH_SIZE, use_copy=None, progress_every=100_000,
+                 stdout=None):
+        self.batch_size = batch_size
+        self.use_copy = connection.vendor == 'postgresql' if use_copy is None else use_copy
+        self.progress_every = progress_every
+        self.stdout = stdout
+        self.resolvers = {
+            'user': ForeignKeyResolver(User),
+            'paid_course': ForeignKeyResolver(Course),
+            'paid_lesson': ForeignKeyResolver(Lesson),
+        }
+        self.imported = 0
+        self.skipped = 0
+        self.other = 0
+        self.explicit_pks = False
+        self.next_progress = progress_every
+        self.started_at = None
+        self.imported_at = None
+
+    def run(self, stream):
+        self.started_at = time.monotonic()
+        # Платежи без даты получают время импорта, как при auto_now_add
+        self.imported_at = timezone.now()
+        batch = []
+        for record in iter_json_records(stream):
+            model = record.get('model')
+            if model is not None and model.lower() != PAYMENT_MODEL_LABEL:
+                # Сохраняем порядок файла: сначала вставляем накопленные платежи
+                self.flush(batch)
+                batch = []
+                self.save_object(record)
+                continue
+
+            fields = record.get('fields', record)
+            if 'pk' in record:
+                # id платежа из фикстуры сохраняется, как в loaddata
+                fields = {**fields, 'id': record['pk']}
+            batch.append(fields)
+            if len(batch) >= self.batch_size:
+                self.flush(batch)
+                batch = []
+        self.flush(batch)
+        if self.explicit_pks:
+            self.reset_sequence()
+        return self.imported
+
+    def save_object(self, record):
+        with transaction.atomic():
+            for obj in serializers.deserialize('python', [record]):
+                obj.save()
+                # Пользователь, курс или урок из файла сразу доступен следующим платежам
+                for resolver in self.resolvers.values():
+                    if isinstance(obj.object, resolver.model):
+                        resolver.known_ids.add(obj.object.pk)
+        self.other += 1
+
+    def flush(self, batch):
+        if not batch:
+            return
+        rows = self.prepare_rows(batch)
+        if rows:
+            with transaction.atomic():
+                if self.use_copy:
+                    self.copy_rows(rows)
+                else:
+                    self.insert_rows(rows)
+                # Пакетная вставка не вызывает сигналы: сводку выручки обновляем агрегатом по пачке,
+                # журнал платежей только дополняем записями пачки
+                add_payments_to_revenue_rollup(
+                    (row['payment_date'], row['paid_course'], row['paid_lesson'], row['payment_method'],
+                     row['payment_amount']) for row in rows
+                )
+                append_payments_to_ledger(
+                    (row['id'], row['user'], row['payment_amount'], row['payment_date']) for row in rows
+                )
+        self.imported += len(rows)
+        self.skipped += len(batch) - len(rows)
+        if self.progress_every and self.stdout is not None and self.imported + self.skipped >= self.next_progress:
+            self.stdout.write(self.format_progress())
+            self.next_progress += self.progress_every
+
+    def prepare_rows(self, batch):
+        known = {
+            field: resolver.resolve({record.get(field) for record in batch})
+            for field, resolver in self.resolvers.items()
+        }
+        # Платежи с уже занятым id пропускаются (в отличие от loaddata, существующие строки не перезаписываются)
+        taken_ids = set(Payment.objects.filter(
+            pk__in={record['id'] for record in batch if record.get('id') is not None}
+        ).values_list('pk', flat=True))
+        rows = []
+        for record in batch:
+            if record.get('user') is None or record.get('id') in taken_ids or any(
+                record.get(field) is not None and record[field] not in known[field] for field in known
+            ):
+                continue
+            row = self.parse_row(record)
+            # Некорректные записи пропускаются, как и записи с несуществующими связями
+            if row is None:
+                continue
+            if row['id'] is not None:
+                taken_ids.add(row['id'])
+                self.explicit_pks = True
+            rows.append(row)
+        return rows
+
+    def parse_row(self, record):
+        payment_date = record.get('payment_date')
+        if payment_date:
+            try:
+                payment_date = parse_datetime(payment_date)
+            except (TypeError, ValueError):
+                return None
+            if payment_date is None:
+                return None
+            if timezone.is_naive(payment_date):
+                payment_date = timezone.make_aware(payment_date)
+        else:
+            payment_date = self.imported_at
+
+        payment_amount = record.get('payment_amount')
+        if not isinstance(payment_amount, int) or isinstance(payment_amount, bool):
+            return None
+        if record.get('payment_method') not in PAYMENT_METHODS:
+            return None
+
+        return {
+            'id': record.get('id'),
+            'user': record['user'],
+            'payment_date': payment_date,
+            'paid_course': record.get('paid_course'),
+            'paid_lesson': record.get('paid_lesson'),
+            'payment_amount': payment_amount,
+            'payment_method': record['payment_method'],
+            'stripe_id': record.get('stripe_id'),
+        }
+
+    def insert_rows(self, rows):
+        payments = [
+            Payment(**{Payment._meta.get_field(field).attname: row[field] for field in PAYMENT_IMPORT_FIELDS})
+            for row in rows
+        ]
+        Payment.objects.bulk_create(payments, batch_size=self.batch_size)
+        # bulk_create заполняет payment_date текущим временем (auto_now_add): возвращаем дату из файла
+        # одним UPDATE ... CASE на пачку. id новых строк bulk_create получает через RETURNING
+        for payment, row in zip(payments, rows):
+            payment.payment_date = row['payment_date']
+            row['id'] = payment.pk
+        Payment.objects.bulk_update(payments, ['payment_date'], batch_size=self.batch_size)
+
+    def copy_rows(self, rows):
+        table = Payment._meta.db_table
+        missing = [row for row in rows if row['id'] is None]
+        if missing:
+            # COPY не возвращает id: резервируем их в последовательности таблицы заранее
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT nextval(pg_get_serial_sequence(%s, 'id')) FROM generate_series(1, %s)",
+                    [table, len(missing)],
+                )
+                for row, (pk,) in zip(missing, cursor.fetchall()):
+                    row['id'] = pk
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow(['' if row[field] is None else row[field] for field in PAYMENT_IMPORT_FIELDS])
+        buffer.seek(0)
+        columns = ', '.join(
+            connection.ops.quote_name(Payment._meta.get_field(field).column) for field in PAYMENT_IMPORT_FIELDS
+        )
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f'COPY {connection.ops.quote_name(table)} ({columns}) FROM STDIN WITH (FORMAT csv)',
+                buffer,
+            )
+
+    @staticmethod
+    def reset_sequence():
+        # После вставки id из файла последовательность должна продолжаться с максимального id, как после loaddata
+        statements = connection.ops.sequence_reset_sql(no_style(), [Payment])
+        if statements:
+            with connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
+
+    def format_progress(self):
+        elapsed = time.monotonic() - self.started_at
+        rate = self.imported / elapsed if elapsed else 0
+        return f'imported={self.imported} skipped={self.skipped} elapsed={elapsed:.1f}s rate={rate:.0f} rows/s'
@@ -0,0 +1,101 @@
+import asyncio
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from payment.models import PaymentMethod
+from payment.services import PaymentService, AsyncPaymentService
+from payment.stripe_client import reset_stripe
+
+
+class StripeStandInHandler(BaseHTTPRequestHandler):
+    """Локальная замена Stripe API: отвечает на создание PaymentIntent с заданной задержкой"""
+    latency = 0.2
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        time.sleep(self.latency)
+        body = json.dumps({'id': 'pi_benchmark', 'object': 'payment_intent', 'status': 'requires_payment_method'})
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body.encode())
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = ('Compare sync (thread per request, as WSGI workers) and async (one event loop) Stripe calls '
+            'of payment creation under concurrency against a local Stripe stand-in')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--workers', type=int, default=4, help='Number of sync (WSGI) workers')
+        parser.add_argument('--latency', type=float, default=0.2, help='Stand-in response latency, seconds')
+
+    def handle(self, *args, **options):
+        StripeStandInHandler.latency = options['latency']
+        server = ThreadingHTTPServer(('127.0.0.1', 0), StripeStandInHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        api_base = f'http://127.0.0.1:{server.server_address[1]}'
+
+        try:
+            with override_settings(STRIPE_API_BASE=api_base, STRIPE_SECRET_KEY='sk_test_benchmark',
+                                   STRIPE_POOL_SIZE=options['concurrency']):
+                reset_stripe()
+                sync_result = self.run_sync(options['requests'], options['workers'])
+                async_result = self.run_async(options['requests'], options['concurrency'])
+        finally:
+            reset_stripe()
+            server.shutdown()
+            server.server_close()
+
+        for name, (elapsed, latencies) in (('sync', sync_result), ('async', async_result)):
+            latencies.sort()
+            self.stdout.write(
+                f'{name}: {options["requests"] / elapsed:.1f} req/s, '
+                f'p50 {statistics.median(latencies) * 1000:.0f} ms, '
+                f'p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:.0f} ms'
+            )
+
+    @staticmethod
+    def run_sync(count, workers):
+        def create(_):
+            started = time.perf_counter()
+            PaymentService().create_payment('benchmark', 100, PaymentMethod.BANK_TRANSFER.name)
+            return time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            latencies = list(executor.map(create, range(count)))
+        return time.perf_counter() - started, latencies
+
+    @staticmethod
+    def run_async(count, concurrency):
+        async def main():
+            service = AsyncPaymentService()
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def create():
+                async with semaphore:
+                    started = time.perf_counter()
+                    await service.create_payment('benchmark', 100, PaymentMethod.BANK_TRANSFER.name)
+                    return time.perf_counter() - started
+
+            started = time.perf_counter()
+            latencies = await asyncio.gather(*(create() for _ in range(count)))
+            await service.get_client().aclose()
+            return time.perf_counter() - started, list(latencies)
+
+        return asyncio.run(main())
@@ -0,0 +1,39 @@
+import os
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from payment.importer import PaymentImporter
+
+
+class Command(BaseCommand):
+    help = 'Stream payments from a JSON array or JSONL file into the database in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', help='JSON/JSONL file (default: payment fixture)')
+        parser.add_argument('--batch-size', type=int, default=settings.PAYMENT_IMPORT_BATCH_SIZE)
+        parser.add_argument('--no-copy', action='store_true', help='Use batched INSERT instead of COPY on PostgreSQL')
+        parser.add_argument('--progress-every', type=int, default=100_000, help='Report progress every N records')
+
+    def handle(self, *args, **options):
+        path = options['path'] or os.path.join(
+            apps.get_app_config('payment').path, 'fixtures', 'payments_fixture.json'
+        )
+        importer = PaymentImporter(
+            batch_size=options['batch_size'],
+            use_copy=False if options['no_copy'] else None,
+            progress_every=options['progress_every'],
+            stdout=self.stdout,
+        )
+        started_at = time.monotonic()
+        with open(path, encoding='utf-8') as stream:
+            importer.run(stream)
+        elapsed = time.monotonic() - started_at
+
+        rate = importer.imported / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Payments imported: {importer.imported}, skipped (unknown user/course/lesson): {importer.skipped}, '
+            f'other objects: {importer.other}, {elapsed:.1f}s, {rate:.0f} rows/s'
+        ))
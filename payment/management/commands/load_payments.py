@@ -6,4 +6,5 @@ class Command(BaseCommand):
     help = 'Load payment data from fixtures'
 
     def handle(self, *args, **options):
-        call_command('loaddata', 'payments_fixture.json')
+        # Потоковый импорт вместо loaddata; сводку выручки пересчитывает сам импорт
+        call_command('import_payments', stdout=self.stdout)
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from payment.services import rebuild_payment_ledger
+
+
+class Command(BaseCommand):
+    help = 'Rebuild per-user payment ledger and summaries from payments'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='user_ids', help='Rebuild only these users')
+
+    def handle(self, *args, **options):
+        rebuild_payment_ledger(user_ids=options['user_ids'])
+        self.stdout.write(self.style.SUCCESS('Payment ledger rebuilt'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from payment.services import rebuild_revenue_rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild revenue rollups from payments'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date-from', help='Rebuild only days starting from this date (YYYY-MM-DD)')
+
+    def handle(self, *args, **options):
+        created = rebuild_revenue_rollups(date_from=options['date_from'])
+        self.stdout.write(self.style.SUCCESS(f'Revenue rollups rebuilt: {created} rows'))
@@ -0,0 +1,35 @@
+# Generated by Django 5.0 on 2026-10-18 14:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0004_notificationoutbox'),
+        ('payment', '0003_payment_payment_date_id_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevenueRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='day')),
+                ('payment_method', models.CharField(choices=[('CASH', 'Наличные'), ('BANK_TRANSFER', 'Перевод на счет')], max_length=20)),
+                ('total_amount', models.BigIntegerField(default=0, verbose_name='total_amount')),
+                ('payments_count', models.IntegerField(default=0, verbose_name='payments_count')),
+                ('paid_course', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='courses.course', verbose_name='paid_course')),
+                ('paid_lesson', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='courses.lesson', verbose_name='paid_lesson')),
+            ],
+            options={
+                'verbose_name': 'revenue rollup',
+                'verbose_name_plural': 'revenue rollups',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='revenuerollup',
+            constraint=models.UniqueConstraint(fields=('day', 'paid_course', 'paid_lesson', 'payment_method'), name='revenue_rollup_unique_key', nulls_distinct=False),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.0 on 2026-10-18 14:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0004_revenuerollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='stripe_amount',
+            field=models.IntegerField(blank=True, null=True, verbose_name='stripe_amount'),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='stripe_status',
+            field=models.CharField(blank=True, max_length=50, null=True, verbose_name='stripe_status'),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='stripe_synced_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='stripe_synced_at'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.0 on 2026-10-18 14:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0004_notificationoutbox'),
+        ('payment', '0006_payment_idempotency_key'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['paid_course', 'payment_date', 'id'], name='payment_course_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['paid_lesson', 'payment_date', 'id'], name='payment_lesson_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['payment_method', 'payment_date', 'id'], name='payment_method_date_idx'),
+        ),
+        migrations.AlterField(
+            model_name='payment',
+            name='paid_course',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='courses.course', verbose_name='paid_course'),
+        ),
+        migrations.AlterField(
+            model_name='payment',
+            name='paid_lesson',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='courses.lesson', verbose_name='paid_lesson'),
+        ),
+    ]
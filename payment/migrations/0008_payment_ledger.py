@@ -0,0 +1,47 @@
+# Generated by Django 5.0 on 2026-10-18 14:31
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0007_payment_filter_indexes'),
+        ('users', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserPaymentSummary',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='payment_summary', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='user')),
+                ('total_paid', models.BigIntegerField(default=0, verbose_name='total_paid')),
+                ('payments_count', models.IntegerField(default=0, verbose_name='payments_count')),
+                ('last_payment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='payment.payment', verbose_name='last_payment')),
+            ],
+            options={
+                'verbose_name': 'user payment summary',
+                'verbose_name_plural': 'user payment summaries',
+            },
+        ),
+        migrations.CreateModel(
+            name='PaymentLedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.IntegerField(verbose_name='amount')),
+                ('balance', models.BigIntegerField(verbose_name='balance')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='created_at')),
+                ('payment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='payment.payment', verbose_name='payment')),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='ledger_entries', to=settings.AUTH_USER_MODEL, verbose_name='user')),
+            ],
+            options={
+                'verbose_name': 'payment ledger entry',
+                'verbose_name_plural': 'payment ledger entries',
+                'indexes': [models.Index(fields=['user', 'id'], name='ledger_user_id_idx')],
+            },
+        ),
+    ]
@@ -1,6 +1,7 @@
 from enum import Enum
 
 from django.db import models
+from django.utils import timezone
 
 from constants import NULLABLE
 
@@ -13,11 +14,18 @@ class PaymentMethod(Enum):
 class Payment(models.Model):
     user = models.ForeignKey('users.User', on_delete=models.CASCADE, verbose_name='user', related_name="payments")
     payment_date = models.DateTimeField(auto_now_add=True, verbose_name='payment_date', **NULLABLE)
-    paid_course = models.ForeignKey('courses.Course', on_delete=models.CASCADE, verbose_name='paid_course', **NULLABLE)
-    paid_lesson = models.ForeignKey('courses.Lesson', on_delete=models.CASCADE, verbose_name='paid_lesson', **NULLABLE)
+    # Отдельные индексы FK не нужны: их покрывают составные индексы (paid_course/paid_lesson, payment_date, id)
+    paid_course = models.ForeignKey('courses.Course', on_delete=models.CASCADE, verbose_name='paid_course',
+                                    db_index=False, **NULLABLE)
+    paid_lesson = models.ForeignKey('courses.Lesson', on_delete=models.CASCADE, verbose_name='paid_lesson',
+                                    db_index=False, **NULLABLE)
     payment_amount = models.IntegerField(verbose_name='payment_amount')
     payment_method = models.CharField(max_length=20, choices=[(tag.name, tag.value) for tag in PaymentMethod])
     stripe_id = models.CharField(max_length=300, verbose_name='stripe_id', **NULLABLE)
+    stripe_status = models.CharField(max_length=50, verbose_name='stripe_status', **NULLABLE)
+    stripe_amount = models.IntegerField(verbose_name='stripe_amount', **NULLABLE)
+    stripe_synced_at = models.DateTimeField(verbose_name='stripe_synced_at', **NULLABLE)
+    idempotency_key = models.CharField(max_length=255, verbose_name='idempotency_key', **NULLABLE)
 
     def __str__(self):
         return f'{self.user}: {self.payment_amount}'
@@ -25,3 +33,75 @@ class Payment(models.Model):
     class Meta:
         verbose_name = 'Payment'
         verbose_name_plural = 'Payments'
+        indexes = [
+            # Курсорная пагинация списка платежей
+            models.Index(fields=['payment_date', 'id'], name='payment_date_id_idx'),
+            # Фильтр списка платежей с сортировкой по дате: страница читается из индекса без сортировки
+            models.Index(fields=['paid_course', 'payment_date', 'id'], name='payment_course_date_idx'),
+            models.Index(fields=['paid_lesson', 'payment_date', 'id'], name='payment_lesson_date_idx'),
+            models.Index(fields=['payment_method', 'payment_date', 'id'], name='payment_method_date_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'idempotency_key'], name='payment_user_idempotency_key_unique'),
+        ]
+
+
+class RevenueRollup(models.Model):
+    day = models.DateField(verbose_name='day')
+    paid_course = models.ForeignKey('courses.Course', on_delete=models.CASCADE, verbose_name='paid_course', **NULLABLE)
+    paid_lesson = models.ForeignKey('courses.Lesson', on_delete=models.CASCADE, verbose_name='paid_lesson', **NULLABLE)
+    payment_method = models.CharField(max_length=20, choices=[(tag.name, tag.value) for tag in PaymentMethod])
+    total_amount = models.BigIntegerField(default=0, verbose_name='total_amount')
+    payments_count = models.IntegerField(default=0, verbose_name='payments_count')
+
+    def __str__(self):
+        return f'{self.day}: {self.total_amount}'
+
+    class Meta:
+        verbose_name = 'revenue rollup'
+        verbose_name_plural = 'revenue rollups'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['day', 'paid_course', 'paid_lesson', 'payment_method'],
+                name='revenue_rollup_unique_key',
+                nulls_distinct=False,
+            ),
+        ]
+
+
+class PaymentLedgerEntry(models.Model):
+    """Запись журнала платежей пользователя с нарастающим итогом (только добавление; удаление платежа - сторно)"""
+    user = models.ForeignKey('users.User', on_delete=models.CASCADE, verbose_name='user', db_index=False,
+                             related_name='ledger_entries')
+    payment = models.ForeignKey(Payment, on_delete=models.SET_NULL, verbose_name='payment', **NULLABLE)
+    amount = models.IntegerField(verbose_name='amount')
+    balance = models.BigIntegerField(verbose_name='balance')
+    created_at = models.DateTimeField(default=timezone.now, verbose_name='created_at')
+
+    def __str__(self):
+        return f'{self.user_id}: {self.amount} ({self.balance})'
+
+    class Meta:
+        verbose_name = 'payment ledger entry'
+        verbose_name_plural = 'payment ledger entries'
+        indexes = [
+            # История пользователя от последней записи
+            models.Index(fields=['user', 'id'], name='ledger_user_id_idx'),
+        ]
+
+
+class UserPaymentSummary(models.Model):
+    """Итоги платежей пользователя, обновляются вместе с журналом"""
+    user = models.OneToOneField('users.User', on_delete=models.CASCADE, primary_key=True, verbose_name='user',
+                                related_name='payment_summary')
+    total_paid = models.BigIntegerField(default=0, verbose_name='total_paid')
+    payments_count = models.IntegerField(default=0, verbose_name='payments_count')
+    last_payment = models.ForeignKey(Payment, on_delete=models.SET_NULL, verbose_name='last_payment',
+                                     related_name='+', **NULLABLE)
+
+    def __str__(self):
+        return f'{self.user_id}: {self.total_paid}'
+
+    class Meta:
+        verbose_name = 'user payment summary'
+        verbose_name_plural = 'user payment summaries'
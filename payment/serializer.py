@@ -1,12 +1,14 @@
 from rest_framework import serializers
 
+from config.sparse_fields import SparseFieldsSerializerMixin
+
 from courses.models.course import Course
 from courses.models.lesson import Lesson
-from payment.models import Payment
+from payment.models import Payment, PaymentLedgerEntry, PaymentMethod, UserPaymentSummary
 from users.models import User
 
 
-class PaymentSerializer(serializers.ModelSerializer):
+class PaymentSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     user = serializers.StringRelatedField()
 
     class Meta:
@@ -30,3 +32,39 @@ class PaymentCreateSerializer(serializers.ModelSerializer):
             'payment_method',
             'user'
         ]
+
+
+class PaymentBatchItemSerializer(serializers.ModelSerializer):
+    """Элемент пакетного создания платежей: плательщик - всегда текущий пользователь"""
+
+    class Meta:
+        model = Payment
+        fields = [
+            'payment_amount',
+            'paid_lesson',
+            'paid_course',
+            'payment_method',
+        ]
+
+
+class RevenueStatsQuerySerializer(serializers.Serializer):
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    paid_course = serializers.IntegerField(required=False)
+    paid_lesson = serializers.IntegerField(required=False)
+    payment_method = serializers.ChoiceField(choices=[tag.name for tag in PaymentMethod], required=False)
+
+
+class PaymentLedgerEntrySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PaymentLedgerEntry
+        fields = ['id', 'payment', 'amount', 'balance', 'created_at']
+
+
+class UserPaymentSummarySerializer(serializers.ModelSerializer):
+    last_payment_date = serializers.DateTimeField(source='last_payment.payment_date', default=None)
+    last_payment_amount = serializers.IntegerField(source='last_payment.payment_amount', default=None)
+
+    class Meta:
+        model = UserPaymentSummary
+        fields = ['total_paid', 'payments_count', 'last_payment', 'last_payment_date', 'last_payment_amount']
@@ -1,59 +1,542 @@
-import os
+import asyncio
+import hashlib
+import json
+import logging
+import weakref
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 
-import stripe
-from rest_framework import status
-from rest_framework.response import Response
+import httpx
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
 
-from payment.models import PaymentMethod, Payment
+from payment.models import PaymentMethod, Payment, PaymentLedgerEntry, RevenueRollup, UserPaymentSummary
+from payment.stripe_client import get_stripe
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_CACHE_KEY = 'payments:idempotency:{user_id}:{key}'
+
+
+def get_stripe_idempotency_key(user, idempotency_key):
+    # Ключ клиента уникален только в пределах пользователя
+    return f'payment-create:{user.pk}:{idempotency_key}' if idempotency_key else None
+
+
+def get_payment_response_data(payment):
+    response_data = {
+        "id": payment.id,
+        "payment_method": payment.payment_method,
+        "payment_amount": payment.payment_amount
+    }
+    if payment.payment_method == PaymentMethod.BANK_TRANSFER.name:
+        response_data["stripe_id"] = payment.stripe_id
+    return response_data
+
+
+class IdempotencyKeyMismatch(Exception):
+    """Idempotency-Key уже использован запросом с другими параметрами"""
+
+
+def get_request_fingerprint(amount, payment_method):
+    """Хеш параметров запроса на создание платежа, с которыми связан Idempotency-Key"""
+    return hashlib.sha256(json.dumps([amount, payment_method]).encode()).hexdigest()
+
+
+def get_idempotent_entry(payment):
+    return {
+        'fingerprint': get_request_fingerprint(payment.payment_amount, payment.payment_method),
+        'response': get_payment_response_data(payment),
+    }
+
+
+def check_idempotent_entry(entry, fingerprint):
+    if entry['fingerprint'] != fingerprint:
+        raise IdempotencyKeyMismatch('Idempotency-Key was already used with different request parameters')
+    return entry['response']
+
+
+def get_idempotent_response(user, idempotency_key, fingerprint):
+    """
+    Ответ на ранее выполненный запрос с тем же Idempotency-Key: из кеша, иначе из БД.
+    Если ключ использован с другими параметрами, выбрасывает IdempotencyKeyMismatch.
+    """
+    cache_key = IDEMPOTENCY_CACHE_KEY.format(user_id=user.pk, key=idempotency_key)
+    entry = cache.get(cache_key)
+    if entry is None:
+        payment = Payment.objects.filter(user=user, idempotency_key=idempotency_key).first()
+        if payment is None:
+            return None
+        entry = get_idempotent_entry(payment)
+        cache.set(cache_key, entry, timeout=settings.IDEMPOTENCY_KEY_CACHE_TIMEOUT)
+    return check_idempotent_entry(entry, fingerprint)
+
+
+async def aget_idempotent_response(user, idempotency_key, fingerprint):
+    cache_key = IDEMPOTENCY_CACHE_KEY.format(user_id=user.pk, key=idempotency_key)
+    entry = await cache.aget(cache_key)
+    if entry is None:
+        payment = await Payment.objects.filter(user=user, idempotency_key=idempotency_key).afirst()
+        if payment is None:
+            return None
+        entry = get_idempotent_entry(payment)
+        await cache.aset(cache_key, entry, timeout=settings.IDEMPOTENCY_KEY_CACHE_TIMEOUT)
+    return check_idempotent_entry(entry, fingerprint)
+
+
+def store_idempotent_response(user, idempotency_key, payment, fingerprint):
+    """
+    Запоминает ответ на запрос с Idempotency-Key. Параллельный запрос с тем же ключом мог сохранить
+    платеж с другими параметрами - тогда выбрасывается IdempotencyKeyMismatch.
+    """
+    entry = get_idempotent_entry(payment)
+    if idempotency_key:
+        cache.set(IDEMPOTENCY_CACHE_KEY.format(user_id=user.pk, key=idempotency_key), entry,
+                  timeout=settings.IDEMPOTENCY_KEY_CACHE_TIMEOUT)
+        return check_idempotent_entry(entry, fingerprint)
+    return entry['response']
+
+
+def get_payment_intent_state(payment_intent, synced_at=None):
+    """Поля платежа с состоянием PaymentIntent на момент synced_at"""
+    return {
+        'stripe_id': payment_intent['id'],
+        'stripe_status': payment_intent['status'],
+        'stripe_amount': payment_intent.get('amount'),
+        'stripe_synced_at': synced_at or timezone.now(),
+    }
 
 
 class PaymentService:
     def __init__(self):
-        self.stripe_api_key = os.getenv('STRIPE_SECRET_KEY')
+        # Общий для процесса клиент Stripe с пулом соединений
+        self.stripe = get_stripe()
+
+    def create_payment(self, user, amount, payment_method, idempotency_key=None):
+        """Создает PaymentIntent для перевода на счет; наличным платежам Stripe не нужен (None)"""
+        if payment_method == PaymentMethod.BANK_TRANSFER.name:
+            return self.create_payment_intent(user, amount, idempotency_key)
+        return None
+
+    def create_payment_intent(self, user, amount, idempotency_key=None):
+        payment_intent = self.stripe.PaymentIntent.create(
+            amount=amount,
+            currency='usd',
+            payment_method_types=['card'],
+            description=f'Payment for user: {user}',
+            idempotency_key=get_stripe_idempotency_key(user, idempotency_key),
+        )
+        return payment_intent
+
+    def create_payments(self, user, items, idempotency_keys=None):
+        """
+        Пакетное создание платежей пользователя: PaymentIntent создаются параллельно в ограниченном пуле потоков,
+        платежи сохраняются одним bulk_create, сводка выручки и журнал обновляются пачкой.
+        idempotency_keys - ключи элементов: элемент с уже сохраненным ключом возвращает сохраненный платеж
+        без обращения к Stripe. Возвращает для каждого элемента Payment или исключение.
+        """
+        keys = idempotency_keys or [None] * len(items)
+        results = [None] * len(items)
+        existing = {}
+        if idempotency_keys:
+            existing = {
+                payment.idempotency_key: payment
+                for payment in Payment.objects.filter(user=user, idempotency_key__in=[key for key in keys if key])
+            }
+        pending = []
+        for index, (item, key) in enumerate(zip(items, keys)):
+            payment = existing.get(key)
+            if payment is None:
+                pending.append(index)
+            elif get_request_fingerprint(payment.payment_amount, payment.payment_method) != get_request_fingerprint(
+                    item['payment_amount'], item['payment_method']):
+                results[index] = IdempotencyKeyMismatch('Idempotency-Key was already used with different parameters')
+            else:
+                results[index] = payment
+
+        def create_intent(item, key):
+            if item['payment_method'] != PaymentMethod.BANK_TRANSFER.name:
+                return None
+            # Ключ элемента передается в Stripe: повтор пакета не создаст второй PaymentIntent
+            return self.create_payment_intent(user, item['payment_amount'], key)
+
+        # Потоки только ждут Stripe и не обращаются к БД
+        workers = max(1, min(settings.PAYMENT_BATCH_WORKERS, len(pending)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {index: executor.submit(create_intent, items[index], keys[index]) for index in pending}
+
+        payments = []
+        for index, future in futures.items():
+            item = items[index]
+            try:
+                payment_intent = future.result()
+            except Exception as e:
+                results[index] = PaymentError(str(e))
+                continue
+            results[index] = Payment(
+                user=user,
+                paid_course=item.get('paid_course'),
+                paid_lesson=item.get('paid_lesson'),
+                payment_amount=item['payment_amount'],
+                payment_method=item['payment_method'],
+                idempotency_key=keys[index],
+                **(get_payment_intent_state(payment_intent) if payment_intent is not None else {}),
+            )
+            payments.append(results[index])
 
-    def create_payment(self, user, amount, payment_method):
         try:
-            stripe.api_key = self.stripe_api_key
-            if payment_method == PaymentMethod.BANK_TRANSFER.name:
-                payment_intent = stripe.PaymentIntent.create(
-                    amount=amount,
-                    currency='usd',
-                    payment_method_types=['card'],
-                    description=f'Payment for user: {user}',
+            with transaction.atomic():
+                Payment.objects.bulk_create(payments)
+                # bulk_create не отправляет post_save: сводка выручки и журнал обновляются пачкой
+                add_payments_to_revenue_rollup(
+                    (payment.payment_date, payment.paid_course_id, payment.paid_lesson_id, payment.payment_method,
+                     payment.payment_amount) for payment in payments
                 )
-                return payment_intent.id
-            elif payment_method == PaymentMethod.CASH.name:
+                append_payments_to_ledger(
+                    (payment.pk, payment.user_id, payment.payment_amount, payment.payment_date) for payment in payments
+                )
+        except Exception:
+            # Платежи не сохранены: созданные PaymentIntent отменяются, чтобы не остались без платежа
+            self.cancel_payment_intents(payment.stripe_id for payment in payments if payment.stripe_id)
+            raise
+        return results
+
+    def cancel_payment_intents(self, stripe_ids):
+        for stripe_id in stripe_ids:
+            try:
+                self.stripe.PaymentIntent.cancel(stripe_id)
+            except Exception:
+                logger.exception('Failed to cancel orphaned PaymentIntent %s', stripe_id)
+
+    def create_and_save_payment(self, user, amount, payment_method, idempotency_key=None):
+        payment_intent = self.create_payment(user, amount, payment_method, idempotency_key)
+        return self.save_payment(user, amount, payment_method, payment_intent, idempotency_key)
+
+    def save_payment(self, user, amount, payment_method, payment_intent=None, idempotency_key=None):
+        # Начальное состояние PaymentIntent сохраняется сразу, первый GET не обращается к Stripe
+        state = get_payment_intent_state(payment_intent) if payment_intent is not None else {}
+        try:
+            with transaction.atomic():
                 payment = Payment.objects.create(
                     user=user,
                     payment_amount=amount,
-                    payment_method=PaymentMethod.CASH,
-                    description=f'Payment for user: {user}',
+                    payment_method=payment_method,
+                    idempotency_key=idempotency_key,
+                    **state,
                 )
-                return payment.stripe_id
-        except Exception as e:
-            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
-
-    def create_and_save_payment(self, user, amount, payment_method):
-        stripe_id = self.create_payment(user, amount, payment_method)
-        if stripe_id is not None:
-            payment = self.save_payment(user, amount, payment_method, stripe_id)
-            return payment
-        else:
-            return None
-
-    def save_payment(self, user, amount, payment_method, stripe_id):
-        payment = Payment.objects.create(
-            user=user,
-            payment_amount=amount,
-            payment_method=payment_method,
-            stripe_id=stripe_id,
-        )
+        except IntegrityError:
+            if not idempotency_key:
+                raise
+            # Параллельный запрос с тем же ключом уже сохранил платеж
+            payment = Payment.objects.get(user=user, idempotency_key=idempotency_key)
         return payment
 
     @staticmethod
     def retrieve(stripe_id):
-        return stripe.PaymentIntent.retrieve(stripe_id)
+        return get_stripe().PaymentIntent.retrieve(stripe_id)
+
+    @classmethod
+    def sync_payment_intent(cls, payment, payment_intent=None, synced_at=None):
+        """
+        Сохраняет в платеже статус и сумму PaymentIntent (запрашивает его у Stripe, если не передан).
+        synced_at - момент, к которому относится состояние (время события Stripe). Состояние старше
+        сохраненного и выход из финального статуса не записываются: события приходят в произвольном порядке.
+        """
+        if payment_intent is None:
+            payment_intent = cls.retrieve(payment.stripe_id)
+        state = get_payment_intent_state(payment_intent, synced_at)
+        del state['stripe_id']
+        updated = Payment.objects.filter(pk=payment.pk).exclude(
+            stripe_status__in=FINAL_PAYMENT_INTENT_STATUSES
+        ).filter(
+            Q(stripe_synced_at__isnull=True) | Q(stripe_synced_at__lte=state['stripe_synced_at'])
+        ).update(**state)
+        if updated:
+            for field, value in state.items():
+                setattr(payment, field, value)
+        else:
+            payment.refresh_from_db(fields=list(state))
+        return payment
+
+
+class AsyncPaymentService:
+    """
+    Создание платежа без блокировки воркера: запрос к Stripe через httpx.AsyncClient
+    со строгими таймаутами и запись платежа через async ORM.
+    """
+    # Один клиент с пулом соединений на каждый event loop процесса
+    clients = weakref.WeakKeyDictionary()
+
+    def get_client(self):
+        loop = asyncio.get_running_loop()
+        client = self.clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(
+                base_url=settings.STRIPE_API_BASE,
+                headers={'Authorization': f'Bearer {settings.STRIPE_SECRET_KEY}'},
+                timeout=httpx.Timeout(settings.STRIPE_READ_TIMEOUT, connect=settings.STRIPE_CONNECT_TIMEOUT),
+                limits=httpx.Limits(max_connections=settings.STRIPE_POOL_SIZE),
+            )
+            self.clients[loop] = client
+        return client
+
+    async def create_payment(self, user, amount, payment_method, idempotency_key=None):
+        """Создает PaymentIntent и возвращает его данные (для наличных - None)"""
+        if payment_method != PaymentMethod.BANK_TRANSFER.name:
+            return None
+        stripe_idempotency_key = get_stripe_idempotency_key(user, idempotency_key)
+        response = await self.get_client().post(
+            '/v1/payment_intents',
+            data={
+                'amount': amount,
+                'currency': 'usd',
+                'payment_method_types[]': 'card',
+                'description': f'Payment for user: {user}',
+            },
+            headers={'Idempotency-Key': stripe_idempotency_key} if stripe_idempotency_key else None,
+        )
+        response.raise_for_status()
+        return response.json()
+
+    async def create_and_save_payment(self, user, amount, payment_method, idempotency_key=None):
+        payment_intent = await self.create_payment(user, amount, payment_method, idempotency_key)
+        try:
+            return await Payment.objects.acreate(
+                user=user,
+                payment_amount=amount,
+                payment_method=payment_method,
+                idempotency_key=idempotency_key,
+                **(get_payment_intent_state(payment_intent) if payment_intent is not None else {}),
+            )
+        except IntegrityError:
+            if not idempotency_key:
+                raise
+            # Параллельный запрос с тем же ключом уже сохранил платеж
+            return await Payment.objects.aget(user=user, idempotency_key=idempotency_key)
 
 
 class PaymentError(Exception):
     pass
+
+
+def get_rollup_day(payment_date):
+    return timezone.localdate(payment_date) if payment_date is not None else timezone.localdate()
+
+
+# Поля платежа, от которых зависит его строка и сумма в сводке выручки
+ROLLUP_FIELDS = ('payment_date', 'paid_course', 'paid_lesson', 'payment_method', 'payment_amount')
+
+
+def get_rollup_key(payment):
+    return {
+        'day': get_rollup_day(payment.payment_date),
+        'paid_course_id': payment.paid_course_id,
+        'paid_lesson_id': payment.paid_lesson_id,
+        'payment_method': payment.payment_method,
+    }
+
+
+def apply_payment_to_rollup(payment, sign=1):
+    """Инкрементально добавляет платеж в дневную сводку выручки (sign=-1 - вычитает)"""
+    add_to_revenue_rollup(get_rollup_key(payment), sign * payment.payment_amount, sign)
+
+
+def update_payment_in_rollup(before, payment):
+    """Применяет к сводке изменение платежа по его значениям до сохранения"""
+    key = get_rollup_key(payment)
+    if get_rollup_key(before) != key:
+        apply_payment_to_rollup(before, sign=-1)
+        apply_payment_to_rollup(payment)
+    elif before.payment_amount != payment.payment_amount:
+        add_to_revenue_rollup(key, payment.payment_amount - before.payment_amount, 0)
+
+
+def add_payments_to_revenue_rollup(payments):
+    """
+    Добавляет в сводку выручки пачку платежей, сохраненных без сигналов: одно изменение на строку сводки.
+    payments - кортежи (payment_date, paid_course_id, paid_lesson_id, payment_method, payment_amount).
+    """
+    deltas = defaultdict(lambda: [0, 0])
+    for payment_date, paid_course_id, paid_lesson_id, payment_method, amount in payments:
+        key = (get_rollup_day(payment_date), paid_course_id, paid_lesson_id, payment_method)
+        deltas[key][0] += amount
+        deltas[key][1] += 1
+    for (day, paid_course_id, paid_lesson_id, payment_method), (amount, count) in deltas.items():
+        add_to_revenue_rollup({
+            'day': day,
+            'paid_course_id': paid_course_id,
+            'paid_lesson_id': paid_lesson_id,
+            'payment_method': payment_method,
+        }, amount, count)
+
+
+def add_to_revenue_rollup(key, amount, count):
+    """
+    Добавляет сумму и число платежей к строке сводки с ключом (day, paid_course_id, paid_lesson_id, payment_method)
+    """
+    changes = {
+        'total_amount': F('total_amount') + amount,
+        'payments_count': F('payments_count') + count,
+    }
+    if RevenueRollup.objects.filter(**key).update(**changes) or count < 0:
+        return
+    try:
+        with transaction.atomic():
+            RevenueRollup.objects.create(**key, total_amount=amount, payments_count=count)
+    except IntegrityError:
+        # Строку сводки уже создал параллельный запрос
+        RevenueRollup.objects.filter(**key).update(**changes)
+
+
+def rebuild_revenue_rollups(date_from=None):
+    """Пересчитывает сводку выручки по таблице платежей (для бэкфилла)"""
+    payments = Payment.objects.all()
+    rollups = RevenueRollup.objects.all()
+    if date_from is not None:
+        payments = payments.filter(payment_date__date__gte=date_from)
+        rollups = rollups.filter(day__gte=date_from)
+
+    rows = payments.annotate(day=TruncDate('payment_date')).values(
+        'day', 'paid_course_id', 'paid_lesson_id', 'payment_method'
+    ).annotate(total_amount=Sum('payment_amount'), payments_count=Count('id')).order_by()
+
+    with transaction.atomic():
+        rollups.delete()
+        return len(RevenueRollup.objects.bulk_create(
+            (RevenueRollup(**row) for row in rows.iterator() if row['day'] is not None),
+            batch_size=1000,
+        ))
+
+
+def record_payment_in_ledger(payment):
+    """Добавляет платеж в журнал пользователя и обновляет его итоги"""
+    with transaction.atomic():
+        # Блокировка строки итогов упорядочивает записи журнала одного пользователя
+        summary, _ = UserPaymentSummary.objects.select_for_update().get_or_create(user_id=payment.user_id)
+        summary.total_paid += payment.payment_amount
+        summary.payments_count += 1
+        summary.last_payment = payment
+        summary.save()
+        PaymentLedgerEntry.objects.create(
+            user_id=payment.user_id,
+            payment=payment,
+            amount=payment.payment_amount,
+            balance=summary.total_paid,
+        )
+
+
+def reverse_payment_in_ledger(payment):
+    """Сторно удаленного платежа: журнал только дополняется, итоги уменьшаются"""
+    with transaction.atomic():
+        summary = UserPaymentSummary.objects.select_for_update().filter(user_id=payment.user_id).first()
+        if summary is None:
+            # Пользователь удален вместе с итогами и журналом
+            return
+        summary.total_paid -= payment.payment_amount
+        summary.payments_count -= 1
+        if summary.last_payment_id is None:
+            summary.last_payment = Payment.objects.filter(user_id=payment.user_id).order_by('-id').first()
+        summary.save()
+        PaymentLedgerEntry.objects.create(
+            user_id=payment.user_id,
+            amount=-payment.payment_amount,
+            balance=summary.total_paid,
+        )
+
+
+def append_payments_to_ledger(payments):
+    """
+    Добавляет в журнал пачку платежей, сохраненных без сигналов (пакетный импорт).
+    payments - кортежи (payment_id, user_id, amount, created_at); записи журнала создаются одним bulk_create,
+    итоги пользователей обновляются одним bulk_update под блокировкой строк итогов.
+    """
+    payments = sorted(payments, key=lambda payment: (payment[1], payment[0]))
+    user_ids = sorted({user_id for _, user_id, _, _ in payments})
+    with transaction.atomic():
+        UserPaymentSummary.objects.bulk_create(
+            [UserPaymentSummary(user_id=user_id) for user_id in user_ids], ignore_conflicts=True
+        )
+        summaries = {
+            summary.user_id: summary
+            for summary in UserPaymentSummary.objects.select_for_update().filter(user_id__in=user_ids).order_by('pk')
+        }
+        entries = []
+        for payment_id, user_id, amount, created_at in payments:
+            summary = summaries[user_id]
+            summary.total_paid += amount
+            summary.payments_count += 1
+            summary.last_payment_id = payment_id
+            entries.append(PaymentLedgerEntry(
+                user_id=user_id,
+                payment_id=payment_id,
+                amount=amount,
+                balance=summary.total_paid,
+                created_at=created_at,
+            ))
+        PaymentLedgerEntry.objects.bulk_create(entries)
+        UserPaymentSummary.objects.bulk_update(summaries.values(), ['total_paid', 'payments_count', 'last_payment'])
+
+
+def rebuild_payment_ledger(user_ids=None, batch_size=1000):
+    """Пересчитывает журнал и итоги по таблице платежей (для бэкфилла)"""
+    if user_ids is not None:
+        user_ids = list(user_ids)
+        for start in range(0, len(user_ids), batch_size):
+            _rebuild_payment_ledger(user_ids[start:start + batch_size], batch_size)
+    else:
+        _rebuild_payment_ledger(None, batch_size)
+
+
+def _rebuild_payment_ledger(user_ids, batch_size):
+    payments = Payment.objects.all()
+    entries = PaymentLedgerEntry.objects.all()
+    summaries = UserPaymentSummary.objects.all()
+    if user_ids is not None:
+        payments = payments.filter(user_id__in=user_ids)
+        entries = entries.filter(user_id__in=user_ids)
+        summaries = summaries.filter(user_id__in=user_ids)
+
+    with transaction.atomic():
+        entries.delete()
+        summaries.delete()
+        batch = []
+        summary = None
+        for payment_id, user_id, amount, payment_date in payments.order_by('user_id', 'id').values_list(
+            'id', 'user_id', 'payment_amount', 'payment_date'
+        ).iterator(chunk_size=batch_size):
+            if summary is None or summary.user_id != user_id:
+                if summary is not None:
+                    summary.save()
+                summary = UserPaymentSummary(user_id=user_id)
+            summary.total_paid += amount
+            summary.payments_count += 1
+            summary.last_payment_id = payment_id
+            batch.append(PaymentLedgerEntry(
+                user_id=user_id,
+                payment_id=payment_id,
+                amount=amount,
+                balance=summary.total_paid,
+                created_at=payment_date or timezone.now(),
+            ))
+            if len(batch) >= batch_size:
+                PaymentLedgerEntry.objects.bulk_create(batch)
+                batch = []
+        PaymentLedgerEntry.objects.bulk_create(batch)
+        if summary is not None:
+            summary.save()
+
+
+# Статусы PaymentIntent, после которых он больше не меняется
+FINAL_PAYMENT_INTENT_STATUSES = ('succeeded', 'canceled')
+
+
+def get_stale_payments():
+    """Платежи со Stripe ID, чье состояние не синхронизировалось дольше STRIPE_SYNC_TTL"""
+    stale_before = timezone.now() - settings.STRIPE_SYNC_TTL
+    return Payment.objects.filter(stripe_id__isnull=False).exclude(
+        stripe_status__in=FINAL_PAYMENT_INTENT_STATUSES
+    ).filter(Q(stripe_synced_at__isnull=True) | Q(stripe_synced_at__lt=stale_before))
@@ -0,0 +1,38 @@
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from payment.models import Payment
+from payment.services import ROLLUP_FIELDS, apply_payment_to_rollup, record_payment_in_ledger, \
+    reverse_payment_in_ledger, update_payment_in_rollup
+
+
+@receiver(pre_save, sender=Payment)
+def payment_saving(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Значения до изменения нужны, чтобы перенести платеж в сводке; сохранения
+    # без полей сводки (например, синхронизация статуса Stripe) не читают строку
+    instance._rollup_before = None
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    if update_fields is not None and not {
+        name for field in ROLLUP_FIELDS for name in (field, Payment._meta.get_field(field).attname)
+    } & set(update_fields):
+        return
+    instance._rollup_before = Payment.objects.only(*ROLLUP_FIELDS).filter(pk=instance.pk).first()
+
+
+@receiver(post_save, sender=Payment)
+def payment_created(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        apply_payment_to_rollup(instance)
+        record_payment_in_ledger(instance)
+    elif getattr(instance, '_rollup_before', None) is not None:
+        update_payment_in_rollup(instance._rollup_before, instance)
+        instance._rollup_before = None
+
+
+@receiver(post_delete, sender=Payment)
+def payment_deleted(sender, instance, **kwargs):
+    apply_payment_to_rollup(instance, sign=-1)
+    reverse_payment_in_ledger(instance)
@@ -0,0 +1,48 @@
+import os
+import threading
+
+import requests
+import stripe
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+_lock = threading.Lock()
+_configured_pid = None
+
+
+def get_stripe():
+    """
+    Возвращает модуль stripe, один раз на процесс настроенный общим HTTP-клиентом:
+    keep-alive пул соединений размера STRIPE_POOL_SIZE, таймауты и повтор запросов
+    с экспоненциальной задержкой (STRIPE_MAX_NETWORK_RETRIES, POST повторяются с ключом идемпотентности).
+    """
+    global _configured_pid
+    # После fork пул соединений родителя использовать нельзя
+    if _configured_pid != os.getpid():
+        with _lock:
+            if _configured_pid != os.getpid():
+                configure_stripe()
+                _configured_pid = os.getpid()
+    return stripe
+
+
+def configure_stripe():
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.STRIPE_POOL_SIZE)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+
+    stripe.api_key = settings.STRIPE_SECRET_KEY
+    stripe.api_base = settings.STRIPE_API_BASE
+    stripe.max_network_retries = settings.STRIPE_MAX_NETWORK_RETRIES
+    stripe.default_http_client = stripe.http_client.RequestsClient(
+        timeout=(settings.STRIPE_CONNECT_TIMEOUT, settings.STRIPE_READ_TIMEOUT),
+        session=session,
+    )
+
+
+def reset_stripe():
+    """Сбрасывает настройку клиента: следующий get_stripe() создаст его заново (например, после смены настроек)"""
+    global _configured_pid
+    with _lock:
+        _configured_pid = None
@@ -0,0 +1,24 @@
+import logging
+
+import stripe
+from celery import shared_task
+from django.conf import settings
+from django.db.models import F
+
+from payment.services import PaymentService, get_stale_payments
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def refresh_payment_intents():
+    """Фоновое обновление устаревшего локального состояния PaymentIntent"""
+    refreshed = 0
+    stale_payments = get_stale_payments().order_by(F('stripe_synced_at').asc(nulls_first=True))
+    for payment in stale_payments[:settings.STRIPE_SYNC_BATCH_SIZE]:
+        try:
+            PaymentService.sync_payment_intent(payment)
+            refreshed += 1
+        except stripe.error.StripeError as e:
+            logger.warning('Failed to refresh PaymentIntent %s: %s', payment.stripe_id, e)
+    return refreshed
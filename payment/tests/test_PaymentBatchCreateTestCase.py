@@ -0,0 +1,125 @@
+import time
+from unittest.mock import patch
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from payment.models import Payment, PaymentMethod, RevenueRollup, UserPaymentSummary
+from users.models import User
+
+
+def slow_payment_intent(amount, **kwargs):
+    # Задержка ответа Stripe
+    time.sleep(0.2)
+    if amount == 666:
+        raise Exception('Card declined')
+    return {'id': f'pi_{amount}', 'status': 'requires_payment_method', 'amount': amount}
+
+
+class PaymentBatchCreateTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(email='test@example.com')
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('payment:payment-create-batch')
+
+    def item(self, amount, payment_method=PaymentMethod.BANK_TRANSFER.name):
+        return {'payment_amount': amount, 'payment_method': payment_method}
+
+    @patch('stripe.PaymentIntent.create', side_effect=slow_payment_intent)
+    def test_batch_create(self, mock_create):
+        """
+        Тест пакета: Stripe вызывается параллельно, платежи сохраняются вместе со сводкой и журналом
+        """
+        items = [self.item(amount) for amount in range(1, 11)] + [self.item(5, PaymentMethod.CASH.name)]
+
+        started_at = time.monotonic()
+        response = self.client.post(self.url, items, format='json')
+        elapsed = time.monotonic() - started_at
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual((response.data['created'], response.data['failed']), (11, 0))
+        self.assertEqual(response.data['results'][0]['payment']['stripe_id'], 'pi_1')
+        self.assertEqual(mock_create.call_count, 10)
+        # Десять запросов по 0.2 с выполняются примерно за время одного
+        self.assertLess(elapsed, 1)
+        self.assertEqual(Payment.objects.count(), 11)
+        self.assertEqual(RevenueRollup.objects.get(payment_method=PaymentMethod.CASH.name).total_amount, 5)
+        self.assertEqual(UserPaymentSummary.objects.get(user=self.user).total_paid, 60)
+
+    @patch('stripe.PaymentIntent.create', side_effect=slow_payment_intent)
+    def test_partial_failure(self, mock_create):
+        """
+        Тест частичной ошибки: невалидный элемент и отказ Stripe не мешают сохранить остальные
+        """
+        items = [self.item(100), self.item(666), {'payment_amount': 1}]
+
+        response = self.client.post(self.url, items, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual([result['status'] for result in response.data['results']], ['created', 'failed', 'invalid'])
+        self.assertEqual(response.data['results'][1]['error'], 'Card declined')
+        self.assertIn('payment_method', response.data['results'][2]['errors'])
+        self.assertEqual(Payment.objects.get().stripe_id, 'pi_100')
+
+    def test_batch_size_limit(self):
+        with self.settings(PAYMENT_BATCH_MAX_SIZE=2):
+            response = self.client.post(self.url, [self.item(1)] * 3, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.post(self.url, {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @patch('stripe.PaymentIntent.create', side_effect=slow_payment_intent)
+    def test_payer_is_request_user(self, mock_create):
+        other = User.objects.create(email='other@example.com')
+
+        response = self.client.post(self.url, [{**self.item(10), 'user': other.pk}], format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Payment.objects.get().user, self.user)
+        self.assertFalse(UserPaymentSummary.objects.filter(user=other).exists())
+
+    @patch('stripe.PaymentIntent.create', side_effect=slow_payment_intent)
+    def test_repeat_batch_with_key(self, mock_create):
+        """
+        Тест повтора пакета с тем же Idempotency-Key: платежи и PaymentIntent не создаются повторно
+        """
+        items = [self.item(1), self.item(2, PaymentMethod.CASH.name)]
+        headers = {'Idempotency-Key': 'batch-1'}
+
+        first = self.client.post(self.url, items, format='json', headers=headers)
+        second = self.client.post(self.url, items, format='json', headers=headers)
+
+        self.assertEqual(first.data['results'], second.data['results'])
+        self.assertEqual(Payment.objects.count(), 2)
+        self.assertEqual(mock_create.call_count, 1)
+        # Ключ элемента передается в Stripe, как при одиночном создании платежа
+        self.assertEqual(mock_create.call_args.kwargs['idempotency_key'], f'payment-create:{self.user.pk}:batch-1:0')
+        self.assertEqual(UserPaymentSummary.objects.get(user=self.user).total_paid, 3)
+
+    @patch('stripe.PaymentIntent.cancel')
+    @patch('stripe.PaymentIntent.create', side_effect=slow_payment_intent)
+    def test_intents_cancelled_when_save_fails(self, mock_create, mock_cancel):
+        with patch('payment.services.append_payments_to_ledger', side_effect=RuntimeError('db failure')), \
+                self.assertRaises(RuntimeError):
+            self.client.post(self.url, [self.item(1), self.item(2)], format='json')
+
+        self.assertFalse(Payment.objects.exists())
+        self.assertEqual(sorted(call.args[0] for call in mock_cancel.call_args_list), ['pi_1', 'pi_2'])
+
+    @patch('stripe.PaymentIntent.create', side_effect=slow_payment_intent)
+    def test_ledger_and_rollup_updated_in_bulk(self, mock_create):
+        """
+        Тест пакетного обновления сводки и журнала: число запросов не растет с размером пакета
+        """
+        def count_queries(size):
+            with CaptureQueriesContext(connection) as queries:
+                self.client.post(self.url, [self.item(amount) for amount in range(1, size + 1)], format='json')
+            return len(queries)
+
+        # Первый пакет создает строки сводки и итогов пользователя
+        count_queries(1)
+        self.assertEqual(count_queries(2), count_queries(8))
@@ -0,0 +1,73 @@
+from unittest.mock import patch
+
+import httpx
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+
+from payment.models import Payment, PaymentMethod
+from payment.services import AsyncPaymentService
+from users.models import User
+
+
+def stripe_stub(request):
+    # Локальная замена Stripe: отвечает созданным PaymentIntent
+    return httpx.Response(200, json={'id': 'pi_async', 'object': 'payment_intent', 'status': 'requires_payment_method'})
+
+
+def stripe_timeout(request):
+    raise httpx.ReadTimeout('timeout', request=request)
+
+
+class PaymentCreateAsyncViewTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(email='test@example.com', is_active=True)
+        self.url = reverse('payment:payment-create-async')
+        self.headers = {'Authorization': f'Bearer {AccessToken.for_user(self.user)}'}
+
+    def mock_client(self, handler):
+        client = httpx.AsyncClient(base_url='http://stripe.test', transport=httpx.MockTransport(handler))
+        return patch.object(AsyncPaymentService, 'get_client', return_value=client)
+
+    async def test_create_bank_transfer_payment(self):
+        """
+        Тест async-создания платежа с запросом к Stripe
+        """
+        with self.mock_client(stripe_stub):
+            response = await self.async_client.post(self.url, {
+                'payment_method': PaymentMethod.BANK_TRANSFER.name,
+                'payment_amount': 200,
+            }, content_type='application/json', headers=self.headers)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json()['stripe_id'], 'pi_async')
+        payment = await Payment.objects.aget(pk=response.json()['id'])
+        self.assertEqual(payment.user_id, self.user.pk)
+
+    async def test_create_cash_payment_without_stripe(self):
+        with self.mock_client(stripe_timeout):
+            response = await self.async_client.post(self.url, {
+                'payment_method': PaymentMethod.CASH.name,
+                'payment_amount': 100,
+            }, content_type='application/json', headers=self.headers)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn('stripe_id', response.json())
+
+    async def test_stripe_timeout(self):
+        """
+        Тест ответа 504 при превышении таймаута Stripe
+        """
+        with self.mock_client(stripe_timeout):
+            response = await self.async_client.post(self.url, {
+                'payment_method': PaymentMethod.BANK_TRANSFER.name,
+                'payment_amount': 200,
+            }, content_type='application/json', headers=self.headers)
+
+        self.assertEqual(response.status_code, status.HTTP_504_GATEWAY_TIMEOUT)
+        self.assertFalse(await Payment.objects.aexists())
+
+    async def test_unauthenticated(self):
+        response = await self.async_client.post(self.url, {}, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,58 @@
+import csv
+import io
+import json
+
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from courses.models.course import Course
+from payment.models import Payment, PaymentMethod
+from users.models import User
+
+
+class PaymentExportTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(email='test@example.com')
+        self.client.force_authenticate(user=self.user)
+        self.course = Course.objects.create(name='Test Course', description='Test Description')
+        self.url = reverse('payment:payment-export')
+        Payment.objects.bulk_create(
+            Payment(
+                user=self.user,
+                paid_course=self.course if i % 2 else None,
+                payment_amount=i,
+                payment_method=PaymentMethod.CASH.name,
+            ) for i in range(1200)
+        )
+
+    def export(self, params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return b''.join(response.streaming_content).decode()
+
+    def test_export_csv(self):
+        """
+        Тест выгрузки CSV с фильтром: все строки одним запросом, пользователь без отдельных запросов
+        """
+        # Проверка существования курса фильтром и один запрос выгрузки
+        with self.assertNumQueries(2):
+            content = self.export({'paid_course': self.course.pk})
+
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual(len(rows), 600)
+        self.assertEqual(rows[0]['user'], 'test@example.com')
+        self.assertEqual(rows[0]['paid_course'], str(self.course.pk))
+        self.assertEqual(rows[0]['paid_lesson'], '')
+
+    def test_export_jsonl(self):
+        content = self.export({'file_format': 'jsonl', 'ordering': '-payment_date'})
+
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(len(rows), 1200)
+        self.assertEqual(rows[0]['payment_amount'], 1199)
+        self.assertEqual(rows[0]['paid_course'], self.course.pk)
+
+    def test_unknown_format(self):
+        response = self.client.get(self.url, {'file_format': 'xml'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
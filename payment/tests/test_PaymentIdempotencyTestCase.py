@@ -0,0 +1,106 @@
+from unittest.mock import patch
+
+import stripe
+
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from payment.models import Payment, PaymentMethod
+from users.models import User
+
+
+class PaymentIdempotencyTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(email='test@example.com', is_active=True)
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('payment:payment-create')
+        self.data = {'payment_method': PaymentMethod.BANK_TRANSFER.name, 'payment_amount': 200}
+
+    @patch('stripe.PaymentIntent.create')
+    def test_repeat_request_returns_same_payment(self, mock_create):
+        """
+        Тест повтора запроса с тем же Idempotency-Key: второй платеж и второй вызов Stripe не создаются
+        """
+        mock_create.return_value = {'id': 'pi_idem', 'status': 'requires_payment_method', 'amount': 200}
+        headers = {'Idempotency-Key': 'key-1'}
+
+        first = self.client.post(self.url, self.data, format='json', headers=headers)
+        second = self.client.post(self.url, self.data, format='json', headers=headers)
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(Payment.objects.count(), 1)
+        mock_create.assert_called_once()
+        self.assertEqual(mock_create.call_args.kwargs['idempotency_key'], f'payment-create:{self.user.pk}:key-1')
+
+    @patch('stripe.PaymentIntent.create')
+    def test_repeat_request_after_cache_eviction(self, mock_create):
+        """
+        Тест повтора запроса после вытеснения из кеша: ответ восстанавливается из БД
+        """
+        mock_create.return_value = {'id': 'pi_idem', 'status': 'requires_payment_method', 'amount': 200}
+        headers = {'Idempotency-Key': 'key-2'}
+
+        first = self.client.post(self.url, self.data, format='json', headers=headers)
+        cache.clear()
+        second = self.client.post(self.url, self.data, format='json', headers=headers)
+
+        self.assertEqual(first.data['id'], second.data['id'])
+        mock_create.assert_called_once()
+
+    @patch('stripe.PaymentIntent.create')
+    def test_requests_without_key_are_independent(self, mock_create):
+        mock_create.side_effect = [
+            {'id': 'pi_1', 'status': 'requires_payment_method', 'amount': 200},
+            {'id': 'pi_2', 'status': 'requires_payment_method', 'amount': 200},
+        ]
+
+        self.client.post(self.url, self.data, format='json')
+        self.client.post(self.url, self.data, format='json')
+
+        self.assertEqual(Payment.objects.count(), 2)
+        self.assertIsNone(mock_create.call_args.kwargs['idempotency_key'])
+
+    def test_cash_payment_with_key(self):
+        """
+        Тест наличного платежа с Idempotency-Key: платеж сохраняется с ключом, повтор не создает второй
+        """
+        data = {'payment_method': PaymentMethod.CASH.name, 'payment_amount': 100}
+        headers = {'Idempotency-Key': 'cash-1'}
+
+        first = self.client.post(self.url, data, format='json', headers=headers)
+        cache.clear()
+        second = self.client.post(self.url, data, format='json', headers=headers)
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(Payment.objects.get().idempotency_key, 'cash-1')
+
+    @patch('stripe.PaymentIntent.create')
+    def test_key_reused_with_different_payload(self, mock_create):
+        """
+        Тест повторного использования ключа с другими параметрами: 422 вместо старого ответа
+        """
+        mock_create.return_value = {'id': 'pi_idem', 'status': 'requires_payment_method', 'amount': 200}
+        headers = {'Idempotency-Key': 'key-3'}
+        self.client.post(self.url, self.data, format='json', headers=headers)
+
+        for clear_cache in (False, True):
+            if clear_cache:
+                cache.clear()
+            response = self.client.post(self.url, {**self.data, 'payment_amount': 999}, format='json',
+                                        headers=headers)
+            self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(Payment.objects.count(), 1)
+
+    @patch('stripe.PaymentIntent.create', side_effect=stripe.error.CardError('Card declined', None, 'card_declined'))
+    def test_stripe_error(self, mock_create):
+        response = self.client.post(self.url, self.data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['error'], 'Card declined')
+        self.assertFalse(Payment.objects.exists())
@@ -0,0 +1,132 @@
+import io
+import json
+from datetime import date
+from unittest import skipUnless
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+
+from courses.models.course import Course
+from courses.models.lesson import Lesson
+from payment.importer import PaymentImporter, iter_json_records
+from payment.models import Payment, PaymentMethod, RevenueRollup
+from users.models import User
+
+
+class PaymentImporterTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(email='test@example.com')
+        self.course = Course.objects.create(name='Test Course', description='Test Description')
+        self.records = [
+            {'user': self.user.pk, 'payment_date': f'2024-01-0{day}T12:00:00Z', 'paid_course': self.course.pk,
+             'payment_amount': 100 * day, 'payment_method': PaymentMethod.CASH.name}
+            for day in range(1, 6)
+        ]
+
+    def test_iter_json_array_and_jsonl(self):
+        """
+        Тест потокового чтения JSON-массива и JSONL фрагментами меньше одной записи
+        """
+        array = io.StringIO(json.dumps(self.records, indent=2))
+        jsonl = io.StringIO('\n'.join(json.dumps(record) for record in self.records))
+
+        self.assertEqual(list(iter_json_records(array, chunk_size=7)), self.records)
+        self.assertEqual(list(iter_json_records(jsonl, chunk_size=7)), self.records)
+
+    def test_import_in_batches(self):
+        """
+        Тест импорта пачками: дата платежа из файла сохраняется, сводка выручки пересчитывается
+        """
+        self.records.append({**self.records[0], 'user': self.user.pk + 100})
+        stream = io.StringIO('\n'.join(json.dumps(record) for record in self.records))
+
+        importer = PaymentImporter(batch_size=2, use_copy=False)
+        importer.run(stream)
+
+        self.assertEqual((importer.imported, importer.skipped), (5, 1))
+        self.assertEqual(Payment.objects.filter(payment_date__date=date(2024, 1, 3)).count(), 1)
+        self.assertEqual(RevenueRollup.objects.get(day=date(2024, 1, 5)).total_amount, 500)
+
+    def test_fk_cache_overflow(self):
+        """
+        Тест переполнения кеша связей: после очистки id пачки проверяются заново, корректные платежи не теряются
+        """
+        courses = [Course.objects.create(name=f'Course {i}', description='Test Description') for i in range(3)]
+        # Вторая пачка содержит уже известный курс и новый, переполняющий кеш
+        order = [0, 1, 1, 2, 0]
+        records = [{**record, 'paid_course': courses[i].pk} for record, i in zip(self.records, order)]
+        importer = PaymentImporter(batch_size=2, use_copy=False)
+        for resolver in importer.resolvers.values():
+            resolver.max_size = 2
+        importer.run(io.StringIO(json.dumps(records)))
+
+        self.assertEqual((importer.imported, importer.skipped), (5, 0))
+
+    def test_malformed_records_are_skipped(self):
+        """
+        Тест некорректных записей: неразбираемая дата, нет суммы или неизвестный способ оплаты - запись пропускается
+        """
+        record = self.records[0]
+        malformed = [
+            {**record, 'payment_date': 'not a date'},
+            {**record, 'payment_date': '2024-13-45T12:00:00Z'},
+            {key: value for key, value in record.items() if key != 'payment_amount'},
+            {**record, 'payment_amount': 'много'},
+            {key: value for key, value in record.items() if key != 'payment_method'},
+            {**record, 'payment_method': 'CRYPTO'},
+        ]
+        importer = PaymentImporter(batch_size=4, use_copy=False)
+        importer.run(io.StringIO(json.dumps(malformed + self.records)))
+
+        self.assertEqual((importer.imported, importer.skipped), (5, 6))
+        self.assertEqual(Payment.objects.count(), 5)
+
+    def test_load_payments_fixture(self):
+        """
+        Тест загрузки фикстуры: пользователи сохраняются, платежи со ссылкой на несуществующий курс пропускаются
+        """
+        lesson = Lesson.objects.create(pk=2, name='Test Lesson', description='Test Description')
+
+        call_command('load_payments', stdout=io.StringIO())
+
+        self.assertTrue(User.objects.filter(email='second@example.com').exists())
+        payment = Payment.objects.get()
+        self.assertEqual((payment.paid_lesson, payment.payment_amount), (lesson, 10))
+
+    def test_fixture_pks_are_kept(self):
+        """
+        Тест id из фикстуры: id сохраняется, занятые id пропускаются, новые платежи получают следующие id
+        """
+        existing = Payment.objects.create(user=self.user, payment_amount=1, payment_method=PaymentMethod.CASH.name)
+        records = [
+            {'model': 'payment.payment', 'pk': existing.pk + 50, 'fields': self.records[0]},
+            {'model': 'payment.payment', 'pk': existing.pk, 'fields': self.records[1]},
+        ]
+        importer = PaymentImporter(use_copy=False)
+        importer.run(io.StringIO(json.dumps(records)))
+
+        self.assertEqual((importer.imported, importer.skipped), (1, 1))
+        payment = Payment.objects.get(pk=existing.pk + 50)
+        self.assertEqual((payment.payment_amount, payment.payment_date.date()), (100, date(2024, 1, 1)))
+        self.assertGreater(
+            Payment.objects.create(user=self.user, payment_amount=1, payment_method=PaymentMethod.CASH.name).pk,
+            payment.pk,
+        )
+
+    @skipUnless(connection.vendor == 'postgresql', 'COPY доступен только на PostgreSQL')
+    def test_import_with_copy(self):
+        """
+        Тест импорта через COPY: id резервируются в последовательности, сводка выручки обновляется
+        """
+        records = [{'model': 'payment.payment', 'pk': 1000, 'fields': self.records[0]}] + self.records[1:]
+        importer = PaymentImporter(batch_size=2, use_copy=True)
+        importer.run(io.StringIO(json.dumps(records)))
+
+        self.assertEqual(importer.imported, 5)
+        self.assertTrue(Payment.objects.filter(pk=1000, payment_date__date=date(2024, 1, 1)).exists())
+        self.assertEqual(RevenueRollup.objects.get(day=date(2024, 1, 5)).total_amount, 500)
+        self.assertGreater(
+            Payment.objects.create(user=self.user, payment_amount=1, payment_method=PaymentMethod.CASH.name).pk,
+            1000,
+        )
@@ -0,0 +1,161 @@
+import hashlib
+import hmac
+import json
+import os
+import time
+from datetime import timedelta
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from payment.models import Payment, PaymentMethod
+from payment.tasks import refresh_payment_intents
+from users.models import User
+
+WEBHOOK_SECRET = 'whsec_test'
+
+
+@override_settings(STRIPE_WEBHOOK_SECRET=WEBHOOK_SECRET)
+class PaymentIntentSyncTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(email='test@example.com', phone='123456789', city='Test City')
+        self.client.force_authenticate(user=self.user)
+        self.payment = Payment.objects.create(
+            user=self.user,
+            payment_amount=100,
+            payment_method=PaymentMethod.BANK_TRANSFER.name,
+            stripe_id='pi_123',
+            stripe_status='requires_payment_method',
+            stripe_amount=100,
+            stripe_synced_at=timezone.now(),
+        )
+        self.url = reverse('payment:payment-retrieve', kwargs={'pk': self.payment.pk})
+
+    @patch('stripe.PaymentIntent.retrieve')
+    def test_retrieve_from_db(self, mock_retrieve):
+        """
+        Тест ответа из БД без запроса к Stripe
+        """
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], 'requires_payment_method')
+        mock_retrieve.assert_not_called()
+
+    @patch('stripe.PaymentIntent.retrieve')
+    def test_retrieve_fresh(self, mock_retrieve):
+        """
+        Тест синхронного запроса к Stripe по ?fresh=1
+        """
+        mock_retrieve.return_value = {'id': 'pi_123', 'status': 'succeeded', 'amount': 100}
+
+        response = self.client.get(self.url, {'fresh': '1'})
+
+        self.assertEqual(response.data['status'], 'succeeded')
+        mock_retrieve.assert_called_once_with('pi_123')
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.stripe_status, 'succeeded')
+
+    @patch('stripe.PaymentIntent.retrieve')
+    @patch('stripe.PaymentIntent.create')
+    def test_created_payment_stores_intent_state(self, mock_create, mock_retrieve):
+        """
+        Тест создания платежа: начальное состояние PaymentIntent сохраняется, первый GET не обращается к Stripe
+        """
+        mock_create.return_value = {'id': 'pi_new', 'status': 'requires_payment_method', 'amount': 300}
+        response = self.client.post(reverse('payment:payment-create'), {
+            'payment_method': PaymentMethod.BANK_TRANSFER.name, 'payment_amount': 300,
+        }, format='json')
+
+        response = self.client.get(reverse('payment:payment-retrieve', kwargs={'pk': response.data['id']}))
+
+        self.assertEqual(response.data['status'], 'requires_payment_method')
+        self.assertEqual(response.data['amount'], 300)
+        mock_retrieve.assert_not_called()
+
+    def post_webhook(self, event, secret=WEBHOOK_SECRET):
+        payload = json.dumps(event)
+        timestamp = int(time.time())
+        signature = hmac.new(secret.encode(), f'{timestamp}.{payload}'.encode(), hashlib.sha256).hexdigest()
+        return self.client.post(reverse('payment:payment-webhook'), payload, content_type='application/json',
+                                HTTP_STRIPE_SIGNATURE=f't={timestamp},v1={signature}')
+
+    def test_webhook_updates_payment(self):
+        """
+        Тест обновления состояния платежа событием Stripe
+        """
+        self.client.force_authenticate(user=None)
+        event = {
+            'id': 'evt_1',
+            'object': 'event',
+            'type': 'payment_intent.succeeded',
+            'data': {'object': {'id': 'pi_123', 'object': 'payment_intent', 'status': 'succeeded', 'amount': 100}},
+        }
+
+        response = self.post_webhook(event)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.stripe_status, 'succeeded')
+
+    def test_webhook_out_of_order_events(self):
+        """
+        Тест порядка событий: запоздавшее событие и выход из финального статуса не перезаписывают состояние
+        """
+        self.client.force_authenticate(user=None)
+
+        def event(event_type, intent_status, created):
+            return {
+                'id': f'evt_{event_type}',
+                'object': 'event',
+                'type': f'payment_intent.{event_type}',
+                'created': int(created.timestamp()),
+                'data': {'object': {'id': 'pi_123', 'object': 'payment_intent', 'status': intent_status,
+                                    'amount': 100}},
+            }
+
+        # Событие старше последней синхронизации
+        self.post_webhook(event('processing', 'processing', timezone.now() - timedelta(minutes=5)))
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.stripe_status, 'requires_payment_method')
+
+        self.post_webhook(event('succeeded', 'succeeded', timezone.now() + timedelta(seconds=1)))
+        self.post_webhook(event('processing', 'processing', timezone.now() + timedelta(seconds=2)))
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.stripe_status, 'succeeded')
+
+    @override_settings(STRIPE_WEBHOOK_SECRET=None)
+    def test_webhook_without_secret(self):
+        response = self.post_webhook({'id': 'evt_1', 'type': 'payment_intent.succeeded'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_webhook_invalid_signature(self):
+        response = self.post_webhook({'id': 'evt_1', 'type': 'payment_intent.succeeded'}, secret='whsec_wrong')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @patch('stripe.PaymentIntent.retrieve')
+    def test_refresh_stale_payments(self, mock_retrieve):
+        """
+        Тест фонового обновления устаревших платежей
+        """
+        mock_retrieve.return_value = {'id': 'pi_123', 'status': 'processing', 'amount': 100}
+        Payment.objects.filter(pk=self.payment.pk).update(stripe_synced_at=timezone.now() - timedelta(hours=1))
+
+        self.assertEqual(refresh_payment_intents(), 1)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.stripe_status, 'processing')
+
+        # Свежие платежи не обновляются
+        self.assertEqual(refresh_payment_intents(), 0)
+
+    @skipUnless(os.getenv('STRIPE_API_BASE'), 'Нужен локальный stub-сервер Stripe (stripe-mock)')
+    def test_retrieve_fresh_from_stub_server(self):
+        response = self.client.get(self.url, {'fresh': '1'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNotNone(response.data['status'])
@@ -0,0 +1,104 @@
+import io
+import json
+
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from payment.importer import PaymentImporter
+from payment.models import Payment, PaymentLedgerEntry, PaymentMethod, UserPaymentSummary
+from payment.services import rebuild_payment_ledger
+from users.models import User
+
+
+class PaymentLedgerTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(email='test@example.com')
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('users:userprofile-payments', args=[self.user.pk])
+
+    def create_payment(self, amount):
+        return Payment.objects.create(user=self.user, payment_amount=amount, payment_method=PaymentMethod.CASH.name)
+
+    def test_ledger_on_create_and_delete(self):
+        """
+        Тест журнала: нарастающий итог при создании платежей и сторно при удалении
+        """
+        self.create_payment(100)
+        payment = self.create_payment(50)
+        last = self.create_payment(30)
+        payment.delete()
+
+        self.assertEqual(list(PaymentLedgerEntry.objects.order_by('id').values_list('amount', 'balance')),
+                         [(100, 100), (50, 150), (30, 180), (-50, 130)])
+        summary = UserPaymentSummary.objects.get(user=self.user)
+        self.assertEqual((summary.total_paid, summary.payments_count, summary.last_payment), (130, 2, last))
+
+        last.delete()
+        summary.refresh_from_db()
+        self.assertEqual((summary.total_paid, summary.payments_count), (100, 1))
+        self.assertIsNotNone(summary.last_payment)
+
+    def test_rebuild_matches_incremental(self):
+        for amount in (10, 20, 30):
+            self.create_payment(amount)
+        expected = list(PaymentLedgerEntry.objects.order_by('id').values_list('payment', 'amount', 'balance'))
+
+        rebuild_payment_ledger()
+
+        self.assertEqual(list(PaymentLedgerEntry.objects.order_by('id').values_list('payment', 'amount', 'balance')),
+                         expected)
+        self.assertEqual(UserPaymentSummary.objects.get(user=self.user).total_paid, 60)
+
+    def test_payments_endpoint(self):
+        """
+        Тест эндпоинта итогов и истории: пользователь, итоги и страница журнала без агрегирующих запросов
+        """
+        for amount in range(1, 16):
+            self.create_payment(amount)
+
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['summary']['total_paid'], 120)
+        self.assertEqual(response.data['summary']['payments_count'], 15)
+        self.assertEqual(response.data['summary']['last_payment_amount'], 15)
+        self.assertEqual([entry['balance'] for entry in response.data['results']][:2], [120, 105])
+        self.assertIsNotNone(response.data['next'])
+
+    def test_payments_endpoint_without_payments(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['summary']['total_paid'], 0)
+        self.assertIsNone(response.data['summary']['last_payment'])
+        self.assertEqual(response.data['results'], [])
+
+    def test_payments_endpoint_owner_or_staff(self):
+        other = User.objects.create(email='other@example.com')
+        url = reverse('users:userprofile-payments', args=[other.pk])
+
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(user=User.objects.create(email='staff@example.com', is_staff=True))
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+
+    def test_import_appends_to_ledger(self):
+        """
+        Тест импорта: журнал дополняется записями импортированных платежей, сторно сохраняются
+        """
+        self.create_payment(100)
+        self.create_payment(40).delete()
+        records = [
+            {'user': self.user.pk, 'payment_date': '2024-01-01T12:00:00Z', 'payment_amount': amount,
+             'payment_method': PaymentMethod.CASH.name}
+            for amount in (5, 7)
+        ]
+
+        PaymentImporter(use_copy=False).run(io.StringIO(json.dumps(records)))
+
+        self.assertEqual(list(PaymentLedgerEntry.objects.order_by('id').values_list('amount', 'balance')),
+                         [(100, 100), (40, 140), (-40, 100), (5, 105), (7, 112)])
+        summary = UserPaymentSummary.objects.get(user=self.user)
+        self.assertEqual((summary.total_paid, summary.payments_count), (112, 3))
@@ -0,0 +1,93 @@
+from datetime import timedelta
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from payment.models import Payment, PaymentMethod
+from users.models import User
+
+
+class PaymentListCursorPaginationTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(email='test@example.com', phone='123456789', city='Test City')
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('payment:payment-list')
+
+        payments = Payment.objects.bulk_create(
+            Payment(
+                user=self.user,
+                payment_amount=i,
+                payment_method=PaymentMethod.CASH.name if i % 2 else PaymentMethod.BANK_TRANSFER.name,
+            ) for i in range(25)
+        )
+        # Часть платежей с одинаковой датой, чтобы проверить однозначность порядка
+        payment_date = timezone.now()
+        for i, payment in enumerate(payments):
+            payment.payment_date = payment_date + timedelta(minutes=i // 3)
+        Payment.objects.bulk_update(payments, ['payment_date'])
+
+    def walk(self, params):
+        amounts = []
+        response = self.client.get(self.url, params)
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            amounts.extend(payment['payment_amount'] for payment in response.data['results'])
+            if response.data['next'] is None:
+                return amounts
+            response = self.client.get(response.data['next'])
+
+    def test_cursor_pagination(self):
+        """
+        Тест обхода всех страниц в курсорном режиме
+        """
+        self.assertEqual(self.walk({'pagination': 'cursor'}), list(range(25)))
+
+    def test_cursor_pagination_with_filters(self):
+        """
+        Тест курсорного режима вместе с фильтрацией и сортировкой
+        """
+        amounts = self.walk({'pagination': 'cursor', 'payment_method': PaymentMethod.CASH.name,
+                             'ordering': '-payment_date'})
+        self.assertEqual(amounts, list(range(23, 0, -2)))
+
+    def test_cursor_pagination_with_null_dates(self):
+        """
+        Тест курсорного режима при NULL в поле сортировки: платежи без даты не теряются и не повторяются
+        """
+        Payment.objects.filter(payment_amount__in=[3, 4, 10, 11, 20]).update(payment_date=None)
+
+        for ordering in ('payment_date', '-payment_date'):
+            with self.subTest(ordering=ordering):
+                amounts = self.walk({'pagination': 'cursor', 'ordering': ordering})
+                expected = Payment.objects.order_by(ordering, 'id' if ordering[0] != '-' else '-id')
+                self.assertEqual(amounts, list(expected.values_list('payment_amount', flat=True)))
+
+    def test_cursor_pagination_previous_link(self):
+        """
+        Тест обратного обхода по ссылкам previous
+        """
+        response = self.client.get(self.url, {'pagination': 'cursor'})
+        while response.data['next'] is not None:
+            response = self.client.get(response.data['next'])
+
+        amounts = [payment['payment_amount'] for payment in response.data['results']]
+        while response.data['previous'] is not None:
+            response = self.client.get(response.data['previous'])
+            amounts = [payment['payment_amount'] for payment in response.data['results']] + amounts
+        self.assertEqual(amounts, list(range(25)))
+
+    def test_cursor_pagination_without_count_and_offset(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url, {'pagination': 'cursor'})
+        sql = ' '.join(query['sql'] for query in queries).upper()
+        self.assertNotIn('COUNT(', sql)
+        self.assertNotIn('OFFSET', sql)
+
+    def test_page_number_pagination_by_default(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['count'], 25)
@@ -0,0 +1,84 @@
+from datetime import timedelta
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from courses.models.course import Course
+from courses.models.lesson import Lesson
+from payment.models import Payment, PaymentMethod
+from users.models import User
+
+PAYMENTS_COUNT = 20000
+
+
+class PaymentQueryPlanTestCase(APITestCase):
+    """Планы запросов списка платежей: фильтр и сортировка по дате обслуживаются индексом"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(email='test@example.com')
+        courses = Course.objects.bulk_create(Course(name=f'Course {i}', description='') for i in range(20))
+        lessons = Lesson.objects.bulk_create(Lesson(name=f'Lesson {i}', description='') for i in range(20))
+        cls.course, cls.lesson = courses[1], lessons[0]
+
+        payment_date = timezone.now()
+        Payment.objects.bulk_create((
+            Payment(
+                user=cls.user,
+                payment_date=payment_date - timedelta(minutes=i),
+                paid_course=courses[i % len(courses)] if i % 2 else None,
+                paid_lesson=None if i % 2 else lessons[i % len(lessons)],
+                payment_amount=i,
+                payment_method=PaymentMethod.CASH.name if i % 3 else PaymentMethod.BANK_TRANSFER.name,
+            ) for i in range(PAYMENTS_COUNT)
+        ), batch_size=1000)
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {connection.ops.quote_name(Payment._meta.db_table)}')
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('payment:payment-list')
+
+    def get_page_plans(self, params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        plans = []
+        with connection.cursor() as cursor:
+            for query in queries:
+                sql = query['sql']
+                if not sql.startswith('SELECT') or Payment._meta.db_table not in sql or 'ORDER BY' not in sql:
+                    continue
+                cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}')
+                plans.append('\n'.join(str(row[-1]) for row in cursor.fetchall()))
+        self.assertTrue(plans)
+        return plans
+
+    def assertIndexedPlan(self, plan):
+        if connection.vendor == 'postgresql':
+            self.assertNotIn('Seq Scan', plan)
+            self.assertNotRegex(plan, r'(?<!Incremental )Sort')
+        else:
+            self.assertNotIn('TEMP B-TREE', plan)
+            self.assertNotRegex(plan, rf'SCAN {Payment._meta.db_table}(?! USING)')
+
+    def test_filtered_ordered_page_plans(self):
+        """
+        Тест планов: отфильтрованная и отсортированная страница читается по индексу без полного скана и сортировки
+        """
+        filters = [
+            {},
+            {'paid_course': self.course.pk},
+            {'paid_lesson': self.lesson.pk},
+            {'payment_method': PaymentMethod.CASH.name},
+        ]
+        for params in filters:
+            for extra in ({}, {'pagination': 'cursor'}, {'ordering': '-payment_date'}):
+                with self.subTest(**params, **extra):
+                    for plan in self.get_page_plans({**params, **extra}):
+                        self.assertIndexedPlan(plan)
@@ -0,0 +1,105 @@
+from datetime import datetime, timezone as dt_timezone
+
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from courses.models.course import Course
+from payment.models import Payment, PaymentMethod, RevenueRollup
+from payment.services import rebuild_revenue_rollups
+from users.models import User
+
+
+class RevenueRollupTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(email='test@example.com', phone='123456789', city='Test City')
+        self.client.force_authenticate(user=self.user)
+        self.course = Course.objects.create(name='Test Course', description='Test Description')
+        self.url = reverse('payment:payment-stats')
+
+    def create_payment(self, amount, payment_method=PaymentMethod.CASH.name, day=None, course=None):
+        payment = Payment.objects.create(user=self.user, paid_course=course or self.course,
+                                         payment_amount=amount, payment_method=payment_method)
+        if day is not None:
+            # payment_date заполняется auto_now_add, переносим платеж на нужный день
+            Payment.objects.filter(pk=payment.pk).update(
+                payment_date=datetime(2024, 1, day, 12, tzinfo=dt_timezone.utc)
+            )
+        return payment
+
+    def test_incremental_update(self):
+        """
+        Тест инкрементального обновления сводки при создании и удалении платежей
+        """
+        self.create_payment(100)
+        payment = self.create_payment(50)
+        self.create_payment(30, payment_method=PaymentMethod.BANK_TRANSFER.name)
+
+        cash = RevenueRollup.objects.get(payment_method=PaymentMethod.CASH.name)
+        self.assertEqual((cash.total_amount, cash.payments_count), (150, 2))
+        self.assertEqual(RevenueRollup.objects.count(), 2)
+
+        payment.delete()
+        cash.refresh_from_db()
+        self.assertEqual((cash.total_amount, cash.payments_count), (100, 1))
+
+    def test_update_moves_payment(self):
+        """
+        Тест изменения платежа: сумма, способ оплаты и дата переносятся в сводке по значениям до сохранения
+        """
+        payment = self.create_payment(100)
+
+        payment.payment_amount = 70
+        payment.save()
+        self.assertEqual(
+            list(RevenueRollup.objects.values_list('payment_method', 'total_amount', 'payments_count')),
+            [(PaymentMethod.CASH.name, 70, 1)]
+        )
+
+        payment.payment_method = PaymentMethod.BANK_TRANSFER.name
+        payment.payment_date = datetime(2024, 1, 2, 12, tzinfo=dt_timezone.utc)
+        payment.save()
+        self.assertEqual(
+            list(RevenueRollup.objects.order_by('day').values_list('payment_method', 'total_amount', 'payments_count')),
+            [(PaymentMethod.BANK_TRANSFER.name, 70, 1), (PaymentMethod.CASH.name, 0, 0)]
+        )
+
+        # Сохранение без полей сводки не читает старую строку платежа
+        with self.assertNumQueries(1):
+            payment.save(update_fields=['stripe_status'])
+
+    def test_rebuild(self):
+        """
+        Тест пересчета сводки по таблице платежей
+        """
+        for day in (1, 1, 2):
+            self.create_payment(10, day=day)
+        RevenueRollup.objects.all().delete()
+
+        self.assertEqual(rebuild_revenue_rollups(), 2)
+        self.assertEqual(
+            list(RevenueRollup.objects.order_by('day').values_list('total_amount', 'payments_count')),
+            [(20, 2), (10, 1)]
+        )
+
+    def test_stats_endpoint(self):
+        """
+        Тест итогов и временного ряда из сводки
+        """
+        other_course = Course.objects.create(name='Other Course', description='Test Description')
+        for day in (1, 2, 2, 3):
+            self.create_payment(10, day=day)
+        self.create_payment(99, day=2, course=other_course)
+        rebuild_revenue_rollups()
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {'paid_course': self.course.pk, 'date_from': '2024-01-02'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total_amount'], 30)
+        self.assertEqual(response.data['payments_count'], 3)
+        self.assertEqual([row['total_amount'] for row in response.data['series']], [20, 10])
+
+    def test_stats_invalid_params(self):
+        response = self.client.get(self.url, {'payment_method': 'CARD'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,37 @@
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, override_settings
+
+from payment.services import PaymentService
+from payment.stripe_client import get_stripe, reset_stripe
+
+
+@override_settings(STRIPE_SECRET_KEY='sk_test', STRIPE_API_BASE='http://stripe.test',
+                   STRIPE_POOL_SIZE=5, STRIPE_MAX_NETWORK_RETRIES=3)
+class StripeClientTestCase(SimpleTestCase):
+    def setUp(self):
+        reset_stripe()
+        self.addCleanup(reset_stripe)
+
+    def test_client_is_shared(self):
+        """
+        Тест общего для процесса HTTP-клиента Stripe с пулом соединений
+        """
+        stripe = get_stripe()
+        http_client = stripe.default_http_client
+
+        PaymentService()
+        PaymentService()
+
+        self.assertIs(get_stripe().default_http_client, http_client)
+        self.assertEqual(stripe.api_key, 'sk_test')
+        self.assertEqual(stripe.api_base, 'http://stripe.test')
+        self.assertEqual(stripe.max_network_retries, 3)
+        adapter = http_client._session.get_adapter('https://api.stripe.com')
+        self.assertEqual(adapter._pool_maxsize, 5)
+
+    def test_client_is_recreated_after_fork(self):
+        http_client = get_stripe().default_http_client
+
+        with patch('payment.stripe_client.os.getpid', return_value=-1):
+            self.assertIsNot(get_stripe().default_http_client, http_client)
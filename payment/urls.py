@@ -1,12 +1,19 @@
 from django.urls import path
+from django.views.decorators.csrf import csrf_exempt
 
 from payment.apps import PaymentConfig
-from payment.views import PaymentListAPIView, PaymentCreateAPIView, PaymentRetrieveAPIView
+from payment.views import PaymentListAPIView, PaymentCreateAPIView, PaymentRetrieveAPIView, RevenueStatsAPIView, \
+    StripeWebhookAPIView, PaymentCreateAsyncView, PaymentExportAPIView, PaymentBatchCreateAPIView
 
 app_name = PaymentConfig.name
 
 urlpatterns = [
     path('', PaymentListAPIView.as_view(), name='payment-list'),
+    path('export/', PaymentExportAPIView.as_view(), name='payment-export'),
     path('create/', PaymentCreateAPIView.as_view(), name='payment-create'),
-    path('retrieve/<int:pk>/', PaymentRetrieveAPIView.as_view(), name='payment-retrieve')
+    path('create/batch/', PaymentBatchCreateAPIView.as_view(), name='payment-create-batch'),
+    path('create/async/', csrf_exempt(PaymentCreateAsyncView.as_view()), name='payment-create-async'),
+    path('retrieve/<int:pk>/', PaymentRetrieveAPIView.as_view(), name='payment-retrieve'),
+    path('stats/', RevenueStatsAPIView.as_view(), name='payment-stats'),
+    path('webhook/', StripeWebhookAPIView.as_view(), name='payment-webhook'),
 ]
@@ -1,25 +1,68 @@
-import os
+import json
+import logging
+from datetime import datetime, timezone as dt_timezone
 
+import httpx
 import stripe
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError
+from django.db.models import Sum
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import generics, status
 from rest_framework.filters import OrderingFilter
 from rest_framework.generics import get_object_or_404
+from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
 
-from payment.models import Payment, PaymentMethod
-from payment.serializer import PaymentSerializer
-from payment.services import PaymentService
+from config.pagination import SwitchablePagination
+from config.sparse_fields import SparseFieldsViewMixin
+from payment.export import EXPORT_FORMATS, iter_payment_rows
+from payment.models import Payment, RevenueRollup
+from payment.serializer import PaymentSerializer, PaymentBatchItemSerializer, RevenueStatsQuerySerializer
+from payment.services import PaymentService, AsyncPaymentService, IdempotencyKeyMismatch, get_idempotent_response, \
+    aget_idempotent_response, store_idempotent_response, get_payment_response_data, get_request_fingerprint
+from users.authentication import CachedJWTAuthentication
+from users.services import aget_cached_user
 
+logger = logging.getLogger(__name__)
 
-class PaymentListAPIView(generics.ListAPIView):
-    serializer_class = PaymentSerializer
-    queryset = Payment.objects.all()
 
+class PaymentFilterMixin:
+    """Фильтры и сортировка списка платежей (общие для списка и выгрузки)"""
     filter_backends = [DjangoFilterBackend, OrderingFilter]
     filterset_fields = ['payment_method', 'paid_course', 'paid_lesson']
     ordering_fields = ['payment_date']
+    ordering = ('payment_date', 'id')
+
+
+class PaymentListAPIView(PaymentFilterMixin, SparseFieldsViewMixin, generics.ListAPIView):
+    serializer_class = PaymentSerializer
+    queryset = Payment.objects.all()
+    pagination_class = SwitchablePagination
+
+
+class PaymentExportAPIView(PaymentFilterMixin, generics.ListAPIView):
+    """Потоковая выгрузка платежей в CSV или JSONL (?file_format=csv|jsonl) с фильтрами списка"""
+    serializer_class = PaymentSerializer
+    queryset = Payment.objects.all()
+    pagination_class = None
+
+    def list(self, request, *args, **kwargs):
+        file_format = request.query_params.get('file_format', 'csv')
+        if file_format not in EXPORT_FORMATS:
+            return Response({'file_format': [f'Supported formats: {", ".join(EXPORT_FORMATS)}']},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        content_type, render = EXPORT_FORMATS[file_format]
+        rows = iter_payment_rows(self.filter_queryset(self.get_queryset()))
+        response = StreamingHttpResponse(render(rows), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="payments.{file_format}"'
+        return response
 
 
 class PaymentCreateAPIView(generics.CreateAPIView):
@@ -33,32 +76,143 @@ class PaymentCreateAPIView(generics.CreateAPIView):
         payment_method = serializer.validated_data.get('payment_method')
         user = self.request.user
         amount = serializer.validated_data.get('payment_amount')
+        headers = self.get_success_headers(serializer.data)
+
+        # Повтор запроса с тем же Idempotency-Key получает сохраненный ответ без обращения к Stripe
+        idempotency_key = request.headers.get('Idempotency-Key')
+        fingerprint = get_request_fingerprint(amount, payment_method)
+        try:
+            if idempotency_key:
+                response_data = get_idempotent_response(user, idempotency_key, fingerprint)
+                if response_data is not None:
+                    return Response(response_data, status=status.HTTP_201_CREATED, headers=headers)
+
+            stripe_handler = PaymentService()
+            payment = stripe_handler.create_and_save_payment(
+                user=user,
+                amount=amount,
+                payment_method=payment_method,
+                idempotency_key=idempotency_key,
+            )
+
+            response_data = store_idempotent_response(user, idempotency_key, payment, fingerprint)
+        except IdempotencyKeyMismatch as e:
+            return Response({"error": str(e)}, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+        except stripe.error.StripeError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(response_data, status=status.HTTP_201_CREATED, headers=headers)
+
+
+class PaymentBatchCreateAPIView(generics.GenericAPIView):
+    """
+    Пакетное создание платежей текущего пользователя: список элементов PaymentBatchItemSerializer.
+    Ответ содержит результат по каждому элементу; при частичной ошибке - 207.
+    С заголовком Idempotency-Key повтор пакета не создает платежи повторно (ключ элемента - '<ключ>:<номер>').
+    """
+    serializer_class = PaymentBatchItemSerializer
+
+    def post(self, request, *args, **kwargs):
+        items = request.data
+        if not isinstance(items, list) or not items:
+            return Response({'detail': 'Expected a non-empty list of payments'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > settings.PAYMENT_BATCH_MAX_SIZE:
+            return Response({'detail': f'At most {settings.PAYMENT_BATCH_MAX_SIZE} payments per batch'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        results = [None] * len(items)
+        valid = {}
+        for index, item in enumerate(items):
+            serializer = self.get_serializer(data=item)
+            if serializer.is_valid():
+                valid[index] = serializer.validated_data
+            else:
+                results[index] = {'index': index, 'status': 'invalid', 'errors': serializer.errors}
+
+        idempotency_key = request.headers.get('Idempotency-Key')
+        keys = [f'{idempotency_key}:{index}' for index in valid] if idempotency_key else None
+        try:
+            payments = PaymentService().create_payments(request.user, list(valid.values()), keys)
+        except IntegrityError:
+            if not idempotency_key:
+                raise
+            return Response({'detail': 'A request with this Idempotency-Key is already in progress'},
+                            status=status.HTTP_409_CONFLICT)
+
+        created = 0
+        for index, result in zip(valid, payments):
+            if isinstance(result, Payment):
+                results[index] = {'index': index, 'status': 'created', 'payment': get_payment_response_data(result)}
+                created += 1
+            else:
+                results[index] = {'index': index, 'status': 'failed', 'error': str(result)}
 
-        stripe_handler = PaymentService()
-        payment = stripe_handler.create_and_save_payment(
-            user=user,
-            amount=amount,
-            payment_method=payment_method
+        return Response(
+            {'created': created, 'failed': len(items) - created, 'results': results},
+            status=status.HTTP_201_CREATED if created == len(items) else status.HTTP_207_MULTI_STATUS,
         )
 
-        headers = self.get_success_headers(serializer.data)
 
-        if payment_method == PaymentMethod.BANK_TRANSFER.name:
-            response_data = {
-                "stripe_id": payment.stripe_id,
-                "id": payment.id,
-                "payment_method": payment.payment_method,
-                "payment_amount": payment.payment_amount
-            }
-            return Response(response_data, status=status.HTTP_201_CREATED, headers=headers)
+async def aauthenticate(request):
+    """JWT-аутентификация для async-представлений: токен проверяется без БД, пользователь читается из кеша"""
+    authentication = CachedJWTAuthentication()
+    header = authentication.get_header(request)
+    raw_token = authentication.get_raw_token(header) if header is not None else None
+    if raw_token is None:
+        return None
+    token = authentication.get_validated_token(raw_token)
+    user = await aget_cached_user(authentication.get_user_id(token))
+    return authentication.check_user(user, token)
+
 
-        if payment_method == PaymentMethod.CASH.name:
-            response_data = {
-                "id": payment.id,
-                "payment_method": payment.payment_method,
-                "payment_amount": payment.payment_amount
-            }
-            return Response(response_data, status=status.HTTP_201_CREATED, headers=headers)
+class PaymentCreateAsyncView(View):
+    """
+    Async-вариант PaymentCreateAPIView для запуска через ASGI (config/asgi.py):
+    воркер не блокируется на время запроса к Stripe.
+    """
+
+    async def post(self, request):
+        try:
+            user = await aauthenticate(request)
+        except AuthenticationFailed as e:
+            # InvalidToken - подкласс AuthenticationFailed
+            return JsonResponse({"detail": str(e.detail['detail'])}, status=status.HTTP_401_UNAUTHORIZED)
+        if user is None:
+            return JsonResponse({"detail": "Учетные данные не были предоставлены."},
+                                status=status.HTTP_401_UNAUTHORIZED)
+
+        try:
+            data = json.loads(request.body) if request.content_type == 'application/json' else request.POST
+        except ValueError:
+            return JsonResponse({"error": "Некорректный JSON."}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = PaymentSerializer(data=data)
+        if not await sync_to_async(serializer.is_valid)():
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        idempotency_key = request.headers.get('Idempotency-Key')
+        amount = serializer.validated_data.get('payment_amount')
+        payment_method = serializer.validated_data.get('payment_method')
+        fingerprint = get_request_fingerprint(amount, payment_method)
+        try:
+            if idempotency_key:
+                response_data = await aget_idempotent_response(user, idempotency_key, fingerprint)
+                if response_data is not None:
+                    return JsonResponse(response_data, status=status.HTTP_201_CREATED)
+
+            payment = await AsyncPaymentService().create_and_save_payment(
+                user=user,
+                amount=amount,
+                payment_method=payment_method,
+                idempotency_key=idempotency_key,
+            )
+            response_data = await sync_to_async(store_idempotent_response)(user, idempotency_key, payment, fingerprint)
+        except IdempotencyKeyMismatch as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+        except httpx.TimeoutException:
+            return JsonResponse({"error": "Stripe не ответил вовремя."}, status=status.HTTP_504_GATEWAY_TIMEOUT)
+        except httpx.HTTPError as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return JsonResponse(response_data, status=status.HTTP_201_CREATED)
 
 
 class PaymentRetrieveAPIView(APIView):
@@ -69,10 +223,16 @@ class PaymentRetrieveAPIView(APIView):
             stripe_id = payment.stripe_id
 
             if stripe_id is not None:
-                stripe.api_key = os.getenv('STRIPE_SECRET_KEY')
-                payment_intent = stripe.PaymentIntent.retrieve(stripe_id)
+                # Состояние PaymentIntent берется из БД, запрос к Stripe - только по ?fresh=1 или без синхронизации
+                if request.query_params.get('fresh') == '1' or payment.stripe_synced_at is None:
+                    PaymentService.sync_payment_intent(payment)
 
-                return Response(payment_intent, status=status.HTTP_200_OK)
+                return Response({
+                    'id': stripe_id,
+                    'status': payment.stripe_status,
+                    'amount': payment.stripe_amount,
+                    'synced_at': payment.stripe_synced_at,
+                }, status=status.HTTP_200_OK)
             else:
                 return Response({"error": "Для этого платежа не существует Stripe ID."},
                                 status=status.HTTP_400_BAD_REQUEST)
@@ -80,3 +240,64 @@ class PaymentRetrieveAPIView(APIView):
         except Exception as e:
             return Response({"error": f"Произошла ошибка: {str(e)}"},
                             status=status.HTTP_404_NOT_FOUND)
+
+
+class RevenueStatsAPIView(APIView):
+    """Итоги и дневной ряд выручки из сводной таблицы RevenueRollup без сканирования платежей"""
+
+    @staticmethod
+    def get(request):
+        query = RevenueStatsQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        rollups = RevenueRollup.objects.all()
+        if 'date_from' in params:
+            rollups = rollups.filter(day__gte=params['date_from'])
+        if 'date_to' in params:
+            rollups = rollups.filter(day__lte=params['date_to'])
+        for field in ('paid_course', 'paid_lesson', 'payment_method'):
+            if field in params:
+                rollups = rollups.filter(**{field: params[field]})
+
+        series = list(rollups.values('day').annotate(
+            total_amount=Sum('total_amount'),
+            payments_count=Sum('payments_count'),
+        ).order_by('day'))
+
+        return Response({
+            'total_amount': sum(row['total_amount'] for row in series),
+            'payments_count': sum(row['payments_count'] for row in series),
+            'series': series,
+        }, status=status.HTTP_200_OK)
+
+
+class StripeWebhookAPIView(APIView):
+    """Прием событий Stripe об изменении PaymentIntent"""
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    @staticmethod
+    def post(request):
+        if not settings.STRIPE_WEBHOOK_SECRET:
+            # Без секрета подпись события проверить нельзя
+            logger.error('STRIPE_WEBHOOK_SECRET is not configured, Stripe event rejected')
+            return Response({"error": "Webhook secret is not configured."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            event = stripe.Webhook.construct_event(
+                request.body,
+                request.headers.get('Stripe-Signature', ''),
+                settings.STRIPE_WEBHOOK_SECRET,
+            )
+        except (ValueError, stripe.error.SignatureVerificationError) as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if event['type'].startswith('payment_intent.'):
+            payment_intent = event['data']['object']
+            # Время события защищает от перезаписи нового состояния запоздавшим событием
+            created = event.get('created')
+            synced_at = datetime.fromtimestamp(created, tz=dt_timezone.utc) if created else None
+            for payment in Payment.objects.filter(stripe_id=payment_intent['id']):
+                PaymentService.sync_payment_intent(payment, payment_intent, synced_at)
+
+        return Response(status=status.HTTP_200_OK)
@@ -28,3 +28,7 @@ class User(AbstractUser):
     class Meta:
         verbose_name = 'user'
         verbose_name_plural = 'users'
+        indexes = [
+            # Поиск активных пользователей с давним входом (disconnect_inactive_users)
+            models.Index(fields=['is_active', 'last_login'], name='user_active_last_login_idx'),
+        ]
@@ -0,0 +1,8 @@
+from rest_framework import permissions
+
+
+class IsProfileOwner(permissions.BasePermission):
+    message = 'Вы не являетесь владельцем профиля'
+
+    def has_object_permission(self, request, view, obj):
+        return request.user == obj
@@ -1,9 +1,22 @@
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+
+from config.sparse_fields import SparseFieldsSerializerMixin
 
 from users.models import User
+from users.services import record_last_login
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = '__all__'
+
+
+class BufferedLastLoginTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Выдача пары токенов: время входа пишется в буфер Redis, в БД его переносит периодическая задача"""
+
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        record_last_login(self.user.pk)
+        return data
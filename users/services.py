@@ -0,0 +1,335 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone as dt_timezone
+from functools import cached_property
+
+import redis
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connection, transaction
+from django.db.models import Case, DateTimeField, Value, When
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from users.models import User
+
+logger = logging.getLogger(__name__)
+
+USER_CACHE_KEY = 'users:auth:{user_id}'
+# Поля, нужные аутентификации и проверкам прав; остальные поля загружаются из БД при обращении
+USER_CACHE_FIELDS = ('id', 'email', 'role', 'is_active', 'is_staff', 'is_superuser')
+
+INACTIVE_USERS_WATERMARK_KEY = 'users:inactive:watermark'
+INACTIVE_USERS_STATS_KEY = 'users:inactive:stats'
+INACTIVE_USERS_FULL_SWEEP_KEY = 'users:inactive:full_swept_at'
+
+LAST_LOGIN_BUFFER_KEY = 'users:last_login:buffer'
+LAST_LOGIN_FLUSH_LOCK_KEY = 'users:last_login:flush_lock'
+
+
+class LocalUserCache:
+    """
+    LRU-кеш пользователей в памяти процесса с коротким TTL: сохранение пользователя в другом
+    процессе очищает только Redis, поэтому локальная запись устаревает не дольше USER_CACHE_LOCAL_TTL.
+    Ключ - значение поля SIMPLE_JWT USER_ID_FIELD (по умолчанию id).
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, user_id):
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is None:
+                return None
+            expires_at, values = entry
+            if expires_at < time.monotonic():
+                del self.entries[user_id]
+                return None
+            self.entries.move_to_end(user_id)
+            return values
+
+    def set(self, user_id, values):
+        with self.lock:
+            self.entries[user_id] = (time.monotonic() + self.ttl, values)
+            self.entries.move_to_end(user_id)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def delete(self, user_id):
+        with self.lock:
+            self.entries.pop(user_id, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+local_users = LocalUserCache(maxsize=settings.USER_CACHE_LOCAL_SIZE, ttl=settings.USER_CACHE_LOCAL_TTL)
+
+
+def _build_user(values):
+    # Экземпляр без запроса к БД: незакешированные поля отложены и загрузятся при обращении.
+    # from_db ожидает значения в порядке полей модели
+    data = dict(zip(USER_CACHE_FIELDS, values))
+    field_names = [field.attname for field in User._meta.concrete_fields if field.attname in data]
+    user = User.from_db(DEFAULT_DB_ALIAS, field_names, [data[name] for name in field_names])
+    if len(values) > len(USER_CACHE_FIELDS):
+        user._password_marker = values[len(USER_CACHE_FIELDS)]
+    return user
+
+
+def _is_valid_entry(values):
+    # Записи без отметки пароля не подходят, если проверка отзыва токенов включена после их сохранения
+    return values is not None and (not jwt_settings.CHECK_REVOKE_TOKEN or len(values) > len(USER_CACHE_FIELDS))
+
+
+def _get_shared_entry(user_id):
+    # Без Redis общего кеша нет: LocMem у каждого процесса свой, и сброс из воркера Celery
+    # не дошел бы до веб-процессов. Тогда запись живет только в памяти процесса USER_CACHE_LOCAL_TTL
+    if not settings.CACHE_ENABLED:
+        return None
+    return cache.get(USER_CACHE_KEY.format(user_id=user_id))
+
+
+def _load_user_values(user_id):
+    if jwt_settings.CHECK_REVOKE_TOKEN:
+        # В кеше хранится отметка пароля для claim отзыва токена, а не сам хеш пароля
+        row = User.objects.filter(**{jwt_settings.USER_ID_FIELD: user_id}).values_list(
+            *USER_CACHE_FIELDS, 'password').first()
+        return row and (*row[:-1], get_md5_hash_password(row[-1]))
+    return User.objects.filter(**{jwt_settings.USER_ID_FIELD: user_id}).values_list(*USER_CACHE_FIELDS).first()
+
+
+def _remember_user(user_id, values):
+    # Внутри незавершенной транзакции данные могут быть откатены - в кеш их не кладем
+    if not connection.in_atomic_block:
+        local_users.set(user_id, values)
+        if settings.CACHE_ENABLED:
+            cache.set(USER_CACHE_KEY.format(user_id=user_id), values, timeout=settings.USER_CACHE_TIMEOUT)
+
+
+def get_cached_user(user_id):
+    """
+    Пользователь для аутентификации по значению USER_ID_FIELD: из памяти процесса, затем из Redis, затем из БД
+    """
+    values = local_users.get(user_id)
+    if not _is_valid_entry(values):
+        values = _get_shared_entry(user_id)
+        if _is_valid_entry(values):
+            local_users.set(user_id, values)
+    if not _is_valid_entry(values):
+        values = _load_user_values(user_id)
+        if values is None:
+            return None
+        _remember_user(user_id, values)
+    return _build_user(values)
+
+
+async def aget_cached_user(user_id):
+    values = local_users.get(user_id)
+    if not _is_valid_entry(values) and settings.CACHE_ENABLED:
+        values = await cache.aget(USER_CACHE_KEY.format(user_id=user_id))
+        if _is_valid_entry(values):
+            local_users.set(user_id, values)
+    if not _is_valid_entry(values):
+        # Промах: чтение из БД и заполнение кеша в потоке соединения с БД (с проверкой транзакции)
+        return await sync_to_async(get_cached_user)(user_id)
+    return _build_user(values)
+
+
+def get_password_marker(user):
+    """Отметка пароля для claim отзыва токена (SIMPLE_JWT CHECK_REVOKE_TOKEN)"""
+    marker = getattr(user, '_password_marker', None)
+    return marker if marker is not None else get_md5_hash_password(user.password)
+
+
+def _invalidate_cached_users(user_ids):
+    for user_id in user_ids:
+        local_users.delete(user_id)
+    if settings.CACHE_ENABLED:
+        cache.delete_many([USER_CACHE_KEY.format(user_id=user_id) for user_id in user_ids])
+
+
+def invalidate_cached_users(user_ids):
+    """
+    Удаляет пользователей (значения USER_ID_FIELD) из кеша сразу и повторно после фиксации транзакции.
+    Без Redis очищается только память текущего процесса, остальные процессы увидят изменения
+    через USER_CACHE_LOCAL_TTL.
+    """
+    user_ids = list(user_ids)
+    _invalidate_cached_users(user_ids)
+    # Параллельный запрос мог успеть закешировать старые данные до фиксации
+    transaction.on_commit(lambda: _invalidate_cached_users(user_ids))
+
+
+class LastLoginFlushTimeout(Exception):
+    """Выгрузка буфера времени входа не дождалась параллельной выгрузки"""
+
+
+class RedisLastLoginBuffer:
+    """
+    Буфер времени входа в hash Redis: user_id -> timestamp. Для выгрузки hash атомарно переименовывается,
+    поэтому входы во время выгрузки попадают в новый hash и не теряются.
+    """
+
+    def __init__(self, location, key):
+        self.location = location
+        self.key = cache.make_key(key)
+        self.processing_key = cache.make_key(f'{key}:flushing')
+
+    @cached_property
+    def client(self):
+        # Отдельный клиент по адресу из CACHES: renamenx и hash недоступны через API кеша Django
+        return redis.Redis.from_url(self.location)
+
+    def add(self, user_id, timestamp):
+        self.client.hset(self.key, user_id, timestamp.timestamp())
+
+    def take(self):
+        client = self.client
+        try:
+            # Не перезаписывает пачку, оставшуюся от прерванной выгрузки
+            client.renamenx(self.key, self.processing_key)
+        except redis.ResponseError:
+            # Новых входов нет
+            pass
+        return {
+            int(user_id): datetime.fromtimestamp(float(timestamp), tz=dt_timezone.utc)
+            for user_id, timestamp in client.hgetall(self.processing_key).items()
+        }
+
+    def commit(self):
+        self.client.delete(self.processing_key)
+
+    def clear(self):
+        self.client.delete(self.key, self.processing_key)
+
+
+def get_redis_location():
+    location = settings.CACHES['default']['LOCATION']
+    # RedisCache принимает список серверов или строку через запятую; первый - основной для записи
+    return location[0] if isinstance(location, (list, tuple)) else location.split(',')[0]
+
+
+# Буфер должен быть общим для веб-процессов и воркеров Celery, поэтому живет только в Redis.
+# Без Redis время входа пишется в строку пользователя сразу (как SIMPLE_JWT UPDATE_LAST_LOGIN)
+last_logins = RedisLastLoginBuffer(get_redis_location(), LAST_LOGIN_BUFFER_KEY) if settings.CACHE_ENABLED else None
+
+
+def record_last_login(user_id):
+    """Запоминает время входа в буфере вместо записи в строку пользователя, без Redis - записывает сразу"""
+    if last_logins is None:
+        # last_login не входит в USER_CACHE_FIELDS, поэтому update без post_save не устаревает кеш аутентификации
+        User.objects.filter(pk=user_id).update(last_login=timezone.now())
+        return
+    last_logins.add(user_id, timezone.now())
+
+
+def flush_last_logins(wait=False):
+    """
+    Переносит время входа из буфера в users_user одним UPDATE ... CASE на пачку LAST_LOGIN_FLUSH_BATCH_SIZE.
+    Параллельная выгрузка пропускается, а с wait=True - дожидается ее завершения; если она не завершилась
+    за LAST_LOGIN_FLUSH_LOCK_TIMEOUT, выбрасывается LastLoginFlushTimeout.
+    """
+    if last_logins is None:
+        return 0
+
+    deadline = time.monotonic() + settings.LAST_LOGIN_FLUSH_LOCK_TIMEOUT
+    while not cache.add(LAST_LOGIN_FLUSH_LOCK_KEY, True, timeout=settings.LAST_LOGIN_FLUSH_LOCK_TIMEOUT):
+        if not wait:
+            return 0
+        if time.monotonic() > deadline:
+            raise LastLoginFlushTimeout('Last login flush lock was not released in time')
+        time.sleep(0.1)
+
+    try:
+        entries = last_logins.take()
+        if not entries:
+            return 0
+        items = sorted(entries.items())
+        batch_size = settings.LAST_LOGIN_FLUSH_BATCH_SIZE
+        updated = 0
+        with transaction.atomic():
+            for start in range(0, len(items), batch_size):
+                batch = items[start:start + batch_size]
+                # last_login не входит в USER_CACHE_FIELDS, поэтому кеш аутентификации не очищается
+                updated += User.objects.filter(pk__in=[user_id for user_id, _ in batch]).update(
+                    last_login=Case(
+                        *[When(pk=user_id, then=Value(timestamp)) for user_id, timestamp in batch],
+                        output_field=DateTimeField(),
+                    )
+                )
+        last_logins.commit()
+    finally:
+        cache.delete(LAST_LOGIN_FLUSH_LOCK_KEY)
+
+    logger.info('Flushed last login of %s users', updated)
+    return updated
+
+
+def get_inactive_users_sweep_stats():
+    return cache.get(INACTIVE_USERS_STATS_KEY, {})
+
+
+def sweep_inactive_users():
+    """
+    Отключает пользователей без входа дольше INACTIVE_USER_DAYS пачками по INACTIVE_USERS_SWEEP_BATCH_SIZE.
+    Просматриваются только активные пользователи, чей срок истек после прошлого запуска (водяной знак),
+    по индексу (is_active, last_login); каждая пачка - отдельная короткая транзакция.
+    Раз в INACTIVE_USERS_FULL_SWEEP_INTERVAL проход выполняется без водяного знака: он находит пользователей
+    со старым last_login, ставших активными позже (включены вручную, импортированы).
+    Перед отбором выгружается буфер времени входа; если выгрузка не удалась, отключение не выполняется.
+    """
+    started_at = time.monotonic()
+    # Время входа копится в буфере: без выгрузки недавно вошедший пользователь выглядел бы неактивным,
+    # поэтому LastLoginFlushTimeout прерывает запуск
+    flush_last_logins(wait=True)
+    expire_date = timezone.now() - timedelta(days=settings.INACTIVE_USER_DAYS)
+    full_swept_at = cache.get(INACTIVE_USERS_FULL_SWEEP_KEY)
+    full = full_swept_at is None or full_swept_at <= timezone.now() - settings.INACTIVE_USERS_FULL_SWEEP_INTERVAL
+    watermark = None if full else cache.get(INACTIVE_USERS_WATERMARK_KEY)
+
+    expired = User.objects.filter(is_active=True, last_login__lte=expire_date)
+    if watermark is not None:
+        expired = expired.filter(last_login__gt=watermark)
+
+    batch_size = settings.INACTIVE_USERS_SWEEP_BATCH_SIZE
+    deactivated = 0
+    batches = 0
+    while True:
+        # Отключенные пользователи выпадают из выборки, поэтому каждая пачка берется с начала (без сортировки)
+        rows = list(expired.values_list('pk', jwt_settings.USER_ID_FIELD)[:batch_size])
+        if not rows:
+            break
+        with transaction.atomic():
+            deactivated += User.objects.filter(pk__in=[pk for pk, _ in rows], is_active=True).update(is_active=False)
+            # update не отправляет post_save - кеш аутентификации очищаем явно
+            invalidate_cached_users([user_id for _, user_id in rows])
+        batches += 1
+        if len(rows) < batch_size:
+            break
+
+    # Пользователи с входом до expire_date обработаны: следующий запуск начнет с этой даты
+    cache.set(INACTIVE_USERS_WATERMARK_KEY, expire_date, timeout=None)
+    if full:
+        cache.set(INACTIVE_USERS_FULL_SWEEP_KEY, timezone.now(), timeout=None)
+    stats = {
+        'swept_at': timezone.now().isoformat(),
+        'watermark': expire_date.isoformat(),
+        'full': full,
+        'deactivated': deactivated,
+        'batches': batches,
+        'duration_seconds': time.monotonic() - started_at,
+    }
+    cache.set(INACTIVE_USERS_STATS_KEY, stats, timeout=None)
+    logger.info('Inactive users sweep (full=%s) deactivated %s users in %s batches, %.3fs',
+                full, deactivated, batches, stats['duration_seconds'])
+    return stats
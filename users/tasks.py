@@ -1,14 +1,13 @@
-from datetime import timedelta
-
 from celery import shared_task
-from django.utils import timezone
 
-from users.models import User
+from users.services import flush_last_logins, sweep_inactive_users
 
 
 @shared_task
 def disconnect_inactive_users():
-    expire_date = timezone.now() - timedelta(days=30)
+    return sweep_inactive_users()
+
 
-    inactive_users = User.objects.filter(last_login__lte=expire_date)
-    inactive_users.update(is_active=False)
+@shared_task
+def flush_last_login_buffer():
+    return flush_last_logins()
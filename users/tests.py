@@ -1,6 +1,22 @@
-from django.test import TestCase
+import threading
+from datetime import timedelta
+from unittest.mock import patch
 
-from users.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from users.models import User, UserRoles
+from users.services import LastLoginFlushTimeout, LAST_LOGIN_FLUSH_LOCK_KEY, get_cached_user, \
+    get_inactive_users_sweep_stats, get_redis_location, local_users
+from users.tasks import disconnect_inactive_users, flush_last_login_buffer
 
 
 class UserStrMethodTest(TestCase):
@@ -11,3 +27,287 @@ class UserStrMethodTest(TestCase):
     def test_str_method_returns(self):
         expected_str = 'test@example.com'
         self.assertEqual(str(self.user), expected_str)
+
+
+class InactiveUsersSweepTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        # Входы из других тестов остаются в буфере процесса и попали бы в выгрузку перед отключением
+        self.addCleanup(cache.clear)
+        now = timezone.now()
+        self.expired = [
+            User.objects.create(email=f'expired{i}@example.com', last_login=now - timedelta(days=40 + i))
+            for i in range(5)
+        ]
+        self.recent = User.objects.create(email='recent@example.com', last_login=now - timedelta(days=1))
+        self.never_logged_in = User.objects.create(email='new@example.com')
+
+    @override_settings(INACTIVE_USERS_SWEEP_BATCH_SIZE=2)
+    def test_sweep_in_batches(self):
+        """
+        Тест отключения неактивных пользователей пачками с записью статистики
+        """
+        stats = disconnect_inactive_users()
+
+        self.assertEqual((stats['deactivated'], stats['batches']), (5, 3))
+        self.assertFalse(User.objects.filter(pk__in=[user.pk for user in self.expired], is_active=True).exists())
+        self.assertEqual(User.objects.filter(pk__in=[self.recent.pk, self.never_logged_in.pk], is_active=True)
+                         .count(), 2)
+        self.assertEqual(get_inactive_users_sweep_stats()['deactivated'], 5)
+
+    def test_watermark_skips_already_processed(self):
+        """
+        Тест водяного знака: повторный запуск не просматривает пользователей, обработанных ранее
+        """
+        disconnect_inactive_users()
+        # Пользователь, включенный вручную после отключения, не отключается инкрементальными запусками
+        User.objects.filter(pk=self.expired[0].pk).update(is_active=True)
+
+        with self.assertNumQueries(1):
+            stats = disconnect_inactive_users()
+
+        self.assertFalse(stats['full'])
+        self.assertEqual(stats['deactivated'], 0)
+        self.assertTrue(User.objects.get(pk=self.expired[0].pk).is_active)
+
+    def test_periodic_full_sweep(self):
+        """
+        Тест полного прохода: пользователь со старым last_login, включенный после прошлого запуска, отключается
+        """
+        disconnect_inactive_users()
+        User.objects.filter(pk=self.expired[0].pk).update(is_active=True)
+
+        with override_settings(INACTIVE_USERS_FULL_SWEEP_INTERVAL=timedelta(0)):
+            stats = disconnect_inactive_users()
+
+        self.assertTrue(stats['full'])
+        self.assertEqual(stats['deactivated'], 1)
+        self.assertFalse(User.objects.get(pk=self.expired[0].pk).is_active)
+
+
+class MemoryLastLoginBuffer:
+    """Буфер в памяти с интерфейсом RedisLastLoginBuffer: тесты выполняются в одном процессе и без Redis"""
+
+    def __init__(self):
+        self.entries = {}
+        self.processing = {}
+        self.lock = threading.Lock()
+
+    def add(self, user_id, timestamp):
+        with self.lock:
+            self.entries[user_id] = max(timestamp, self.entries.get(user_id, timestamp))
+
+    def take(self):
+        with self.lock:
+            if not self.processing:
+                self.processing, self.entries = self.entries, {}
+            return dict(self.processing)
+
+    def commit(self):
+        with self.lock:
+            self.processing = {}
+
+
+class LastLoginTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create(email='test@example.com', last_login=timezone.now() - timedelta(days=40))
+        self.user.set_password('secret')
+        self.user.save()
+
+    def test_token_obtain_without_redis_updates_last_login(self):
+        """
+        Тест выдачи токена без Redis: буфера нет, время входа записывается сразу и видно отключению неактивных
+        """
+        response = self.client.post(reverse('users:token_obtain_pair'),
+                                    {'email': self.user.email, 'password': 'secret'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertGreater(User.objects.get(pk=self.user.pk).last_login, timezone.now() - timedelta(minutes=1))
+        self.assertEqual(disconnect_inactive_users()['deactivated'], 0)
+
+    @override_settings(LAST_LOGIN_FLUSH_LOCK_TIMEOUT=0)
+    @patch('users.services.last_logins', new_callable=MemoryLastLoginBuffer)
+    def test_sweep_aborts_when_flush_times_out(self, buffer):
+        """
+        Тест отключения неактивных при незавершенной выгрузке буфера: запуск прерывается без отключений
+        """
+        cache.add(LAST_LOGIN_FLUSH_LOCK_KEY, True)
+
+        with self.assertRaises(LastLoginFlushTimeout):
+            disconnect_inactive_users()
+
+        self.assertTrue(User.objects.get(pk=self.user.pk).is_active)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+                                           'LOCATION': 'redis://primary:6379/1,redis://replica:6379/1'}})
+    def test_redis_location(self):
+        self.assertEqual(get_redis_location(), 'redis://primary:6379/1')
+
+
+class LastLoginBufferTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        patcher = patch('users.services.last_logins', new_callable=MemoryLastLoginBuffer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(cache.clear)
+        self.users = [User.objects.create(email=f'user{i}@example.com') for i in range(3)]
+        for user in self.users:
+            user.set_password('secret')
+            user.save()
+
+    def obtain_token(self, user):
+        return self.client.post(reverse('users:token_obtain_pair'), {'email': user.email, 'password': 'secret'})
+
+    def test_token_obtain_buffers_last_login(self):
+        """
+        Тест выдачи токена: время входа не пишется в строку пользователя до выгрузки буфера
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.obtain_token(self.users[0])
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse([query for query in queries if query['sql'].startswith('UPDATE')])
+        self.assertIsNone(User.objects.get(pk=self.users[0].pk).last_login)
+
+    def test_flush_single_update(self):
+        """
+        Тест выгрузки буфера: время входа всех пользователей записывается одним UPDATE
+        """
+        for user in self.users:
+            self.obtain_token(user)
+
+        with CaptureQueriesContext(connection) as queries:
+            updated = flush_last_login_buffer()
+
+        self.assertEqual(updated, 3)
+        self.assertEqual(len([query for query in queries if query['sql'].startswith('UPDATE')]), 1)
+        self.assertFalse(User.objects.filter(pk__in=[user.pk for user in self.users], last_login=None).exists())
+        # Буфер очищен: повторная выгрузка ничего не пишет
+        with self.assertNumQueries(0):
+            self.assertEqual(flush_last_login_buffer(), 0)
+
+    def test_sweep_flushes_buffer_first(self):
+        """
+        Тест отключения неактивных: недавний вход из буфера учитывается, пользователь остается активным
+        """
+        user = self.users[0]
+        User.objects.filter(pk=user.pk).update(last_login=timezone.now() - timedelta(days=40))
+        self.obtain_token(user)
+
+        stats = disconnect_inactive_users()
+
+        self.assertEqual(stats['deactivated'], 0)
+        self.assertTrue(User.objects.get(pk=user.pk).is_active)
+
+
+class CachedJWTAuthenticationTestCase(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        local_users.clear()
+        self.addCleanup(cache.clear)
+        self.addCleanup(local_users.clear)
+        self.user = User.objects.create(email='test@example.com', last_login=timezone.now() - timedelta(days=40))
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+        self.url = reverse('courses:lesson-list')
+
+    def get_user_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        return response, [query['sql'] for query in queries if 'users_user' in query['sql']]
+
+    @override_settings(CACHE_ENABLED=True)
+    def test_user_resolved_from_cache(self):
+        """
+        Тест аутентификации: пользователь читается из БД только при первом запросе
+        """
+        response, user_queries = self.get_user_queries()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(user_queries), 1)
+
+        # Другой процесс: локального LRU нет, пользователь берется из общего кеша
+        local_users.clear()
+        response, user_queries = self.get_user_queries()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(user_queries, [])
+
+    def test_invalidated_on_save(self):
+        """
+        Тест сброса кеша при сохранении пользователя: смена роли сразу видна проверкам прав
+        """
+        self.get_user_queries()
+        self.user.role = UserRoles.MODERATOR
+        self.user.save()
+
+        response, user_queries = self.get_user_queries()
+        self.assertEqual(len(user_queries), 1)
+        self.assertEqual(get_cached_user(self.user.pk).role, UserRoles.MODERATOR)
+
+    def test_shared_cache_disabled_without_redis(self):
+        """
+        Тест запуска без Redis: общий кеш не используется, другой процесс читает пользователя из БД
+        """
+        self.get_user_queries()
+        self.assertIsNone(cache.get(f'users:auth:{self.user.pk}'))
+
+        local_users.clear()
+        response, user_queries = self.get_user_queries()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(user_queries), 1)
+
+    # override_settings(SIMPLE_JWT=...) создает новый объект настроек, а модули simplejwt держат прежний
+    @override_settings(CACHE_ENABLED=True)
+    @patch.object(jwt_settings, 'CHECK_REVOKE_TOKEN', True)
+    def test_revoked_after_password_change(self):
+        """
+        Тест отзыва токена при смене пароля: в кеше хранится отметка пароля, а не его хеш
+        """
+        self.user.set_password('old-password')
+        self.user.save()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+        response, _ = self.get_user_queries()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn(self.user.password, cache.get(f'users:auth:{self.user.pk}'))
+
+        self.user.set_password('new-password')
+        self.user.save()
+
+        response, _ = self.get_user_queries()
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response.data['code'], 'password_changed')
+
+    @patch.object(jwt_settings, 'USER_ID_FIELD', 'email')
+    @patch.object(jwt_settings, 'USER_ID_CLAIM', 'user_email')
+    def test_user_id_field(self):
+        """
+        Тест USER_ID_FIELD: пользователь ищется и сбрасывается из кеша по email из токена
+        """
+        token = AccessToken.for_user(self.user)
+        self.assertEqual(token['user_email'], self.user.email)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        response, _ = self.get_user_queries()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNotNone(local_users.get(self.user.email))
+
+        disconnect_inactive_users()
+
+        response, _ = self.get_user_queries()
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_invalidated_by_inactive_users_sweep(self):
+        self.get_user_queries()
+
+        disconnect_inactive_users()
+
+        response, _ = self.get_user_queries()
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deferred_fields_loaded_on_access(self):
+        User.objects.filter(pk=self.user.pk).update(city='Москва')
+
+        user = get_cached_user(self.user.pk)
+
+        self.assertEqual(user.city, 'Москва')
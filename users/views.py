@@ -1,9 +1,30 @@
 from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 
+from config.pagination import KeysetPagination
+from config.sparse_fields import SparseFieldsViewMixin
+
+from payment.models import PaymentLedgerEntry, UserPaymentSummary
+from payment.serializer import PaymentLedgerEntrySerializer, UserPaymentSummarySerializer
 from users.models import User
+from users.permissions import IsProfileOwner
 from users.seriliazers import UserSerializer
 
 
-class UserProfileViewSet(viewsets.ModelViewSet):
+class UserProfileViewSet(SparseFieldsViewMixin, viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
+
+    @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated, IsProfileOwner | IsAdminUser])
+    def payments(self, request, pk=None):
+        """Итоги и история платежей пользователя из журнала, без агрегирующих запросов"""
+        user = self.get_object()
+        summary = UserPaymentSummary.objects.select_related('last_payment').filter(user=user).first()
+        summary_data = UserPaymentSummarySerializer(summary or UserPaymentSummary(user=user)).data
+
+        paginator = KeysetPagination()
+        entries = paginator.paginate_queryset(PaymentLedgerEntry.objects.filter(user=user), request, view=self)
+        response = paginator.get_paginated_response(PaymentLedgerEntrySerializer(entries, many=True).data)
+        response.data['summary'] = summary_data
+        return response